@@ -0,0 +1,120 @@
+from core.cache import skip_caching
+from posts import thumbnails
+
+# Поля поста, которые можно запросить через ``fields=``: колонки для
+# ``only()`` и связи для ``select_related()``. ``pub_date`` грузится
+# всегда — по нему строится курсор.
+POST_FIELDS = {
+    'id': ((), ()),
+    'text': (('text',), ()),
+    'pub_date': ((), ()),
+    'author': (
+        ('author__username', 'author__first_name', 'author__last_name'),
+        ('author',),
+    ),
+    'group': (('group__slug', 'group__title'), ('group',)),
+    'image': (('image',), ()),
+    'thumbnail': (('image',), ()),
+    'comment_count': (('comment_count',), ()),
+}
+DEFAULT_POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author', 'group', 'thumbnail',
+    'comment_count',
+)
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(value):
+    """Кортеж полей из ``fields=id,text``; пустое значение — все."""
+    if not value:
+        return DEFAULT_POST_FIELDS
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. '
+            f'Доступны: {", ".join(POST_FIELDS)}.'
+        )
+    return fields
+
+
+def project(queryset, fields):
+    """Загрузить только колонки и связи выбранных полей."""
+    columns, relations = {'pub_date'}, set()
+    for name in fields:
+        field_columns, field_relations = POST_FIELDS[name]
+        columns.update(field_columns)
+        relations.update(field_relations)
+    if relations:
+        queryset = queryset.select_related(*sorted(relations))
+    return queryset.only(*sorted(columns))
+
+
+def prepare(posts, fields):
+    """Найти миниатюры всей страницы разом, если они запрошены."""
+    if 'thumbnail' in fields:
+        thumbnails.resolve(posts)
+
+
+def user(instance):
+    return {'username': instance.username, 'name': instance.get_full_name()}
+
+
+def group(instance):
+    if instance is None:
+        return None
+    return {'slug': instance.slug, 'title': instance.title}
+
+
+def picture(post):
+    """Самая широкая миниатюра поста со ``srcset`` по MIME-типам.
+
+    Пока воркер строит миниатюры, возвращается None, а ответ уходит
+    без ETag, чтобы клиент не запомнил его.
+    """
+    if not post.image:
+        return None
+    geometry = next(iter(thumbnails.GEOMETRIES))
+    resolved = post.thumbnails.get(geometry)
+    if resolved is None:
+        skip_caching()
+        return None
+    srcset = dict(resolved.sources)
+    fallback = thumbnails.MIME_TYPES[thumbnails.FORMATS[-1]]
+    srcset[fallback] = resolved.fallback_srcset
+    return {
+        'url': resolved.url,
+        'width': resolved.width,
+        'height': resolved.height,
+        'srcset': srcset,
+    }
+
+
+def post(instance, fields):
+    data = {}
+    for name in fields:
+        if name == 'author':
+            data[name] = user(instance.author)
+        elif name == 'group':
+            data[name] = group(instance.group)
+        elif name == 'image':
+            data[name] = instance.image.url if instance.image else None
+        elif name == 'thumbnail':
+            data[name] = picture(instance)
+        else:
+            data[name] = getattr(instance, name)
+    return data
+
+
+def comment(instance):
+    return {
+        'id': instance.id,
+        'author': user(instance.author),
+        'text': instance.text,
+        'created': instance.created,
+    }
@@ -0,0 +1,210 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Comment, Group, Post, User
+from posts.views import COMMENTS_CONST, POSTS_CONST
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='An', first_name='Анна', last_name='Петрова'
+        )
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(POSTS_CONST + 3):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+        cls.post = Post.objects.latest('pk')
+        for number in range(COMMENTS_CONST + 2):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Комментарий {number}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_page_and_cursor(self):
+        """Лента отдаётся страницами, курсор ведёт на следующую."""
+        response = self.client.get(reverse('api:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(len(data['results']), POSTS_CONST)
+        self.assertIsNone(data['previous'])
+        first = data['results'][0]
+        self.assertEqual(first['id'], self.post.pk)
+        self.assertEqual(
+            first['author'], {'username': 'An', 'name': 'Анна Петрова'}
+        )
+        self.assertEqual(first['group'], {'slug': 'group', 'title': 'Группа'})
+        self.assertIsNone(first['thumbnail'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNone(data['next'])
+
+    def test_feed_query_count(self):
+        """Страница ленты — один запрос, плюс группа или автор и ETag."""
+        pages = {
+            reverse('api:index'): 1,
+            reverse('api:group_list', args=['group']): 3,
+            reverse('api:profile', args=['An']): 3,
+        }
+        for url, queries in pages.items():
+            self.client.get(url)
+            cache.clear()
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                self.client.get(url)
+
+    def test_fields_select_columns(self):
+        """``fields=`` оставляет в ответе и в SQL только нужные поля."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api:index'), {'fields': 'id,author'}
+            )
+        first = response.json()['results'][0]
+        self.assertEqual(list(first), ['id', 'author'])
+        self.assertNotIn('"text"', queries[0]['sql'])
+        self.assertIn('fields=id%2Cauthor', response.json()['next'])
+
+    def test_unknown_field(self):
+        """Неизвестное поле — 400 с описанием."""
+        response = self.client.get(reverse('api:index'), {'fields': 'x'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('x', response.json()['error'])
+
+    def test_group_and_profile(self):
+        """Лента группы и профиля описывают свою группу и автора."""
+        data = self.client.get(
+            reverse('api:group_list', args=['group'])
+        ).json()
+        self.assertEqual(data['group']['slug'], 'group')
+        data = self.client.get(reverse('api:profile', args=['An'])).json()
+        self.assertEqual(data['author']['posts_count'], POSTS_CONST + 3)
+        self.assertEqual(
+            data['author']['comments_count'], COMMENTS_CONST + 2
+        )
+
+    def test_not_found(self):
+        """Несуществующие объекты — 404 в JSON."""
+        urls = (
+            reverse('api:group_list', args=['missing']),
+            reverse('api:profile', args=['missing']),
+            reverse('api:post_detail', args=[0]),
+            reverse('api:post_comments', args=[0]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('error', response.json())
+
+    def test_post_detail_with_comments(self):
+        """Пост приходит с первой страницей комментариев."""
+        with self.assertNumQueries(3):
+            data = self.client.get(
+                reverse('api:post_detail', args=[self.post.pk])
+            ).json()
+        self.assertEqual(data['post']['text'], self.post.text)
+        self.assertEqual(data['post']['comment_count'], COMMENTS_CONST + 2)
+        comments = data['comments']
+        self.assertEqual(len(comments['results']), COMMENTS_CONST)
+        self.assertEqual(comments['results'][0]['text'], 'Комментарий 0')
+        rest = self.client.get(comments['next']).json()
+        self.assertEqual(
+            [comment['text'] for comment in rest['results']],
+            [f'Комментарий {COMMENTS_CONST}',
+             f'Комментарий {COMMENTS_CONST + 1}'],
+        )
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag получает 304."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_invalidates_feeds(self):
+        """Новый комментарий меняет ETag лент, где видно их число."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_list', args=['group']),
+            reverse('api:profile', args=['An']),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        reader = User.objects.create_user(username='reader')
+        Comment.objects.create(post=self.post, author=reader, text='Новый')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.json()['results'][0]['comment_count'],
+                    COMMENTS_CONST + 3
+                )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ApiThumbnailTest(TestCase):
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=cls.small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_thumbnail_urls(self):
+        """Пока миниатюры нет — null без ETag, затем адреса вариантов."""
+        url = reverse('api:index')
+        response = self.client.get(url, {'fields': 'id,image,thumbnail'})
+        first = response.json()['results'][0]
+        self.assertIsNone(first['thumbnail'])
+        self.assertEqual(first['image'], self.post.image.url)
+        self.assertFalse(response.has_header('ETag'))
+        thumbnails.generate(self.post.image.name, self.post.pk)
+        response = self.client.get(url, {'fields': 'thumbnail'})
+        thumbnail = response.json()['results'][0]['thumbnail']
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (960, 339))
+        self.assertTrue(thumbnail['url'].startswith(settings.MEDIA_URL))
+        self.assertIn('960w', thumbnail['srcset']['image/jpeg'])
+        self.assertTrue(response.has_header('ETag'))
@@ -0,0 +1,134 @@
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.conditional import condition_on_tags
+from posts import cache_tags, user_stats
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator
+from posts.views import COMMENTS_CONST, POSTS_CONST
+from . import serializers
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def _error(message, status):
+    return _json({'error': message}, status=status)
+
+
+def _link(request, cursor, path=None):
+    """Адрес соседней страницы с теми же параметрами запроса."""
+    if cursor is None:
+        return None
+    if path is not None:
+        return f'{path}?{urlencode({"cursor": cursor})}'
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _page(request, page_obj, results, path=None):
+    return {
+        'results': results,
+        'previous': _link(request, page_obj.previous_cursor, path),
+        'next': _link(request, page_obj.next_cursor, path),
+    }
+
+
+def _feed(request, posts, **extra):
+    """Страница постов в JSON: ``?cursor=`` и ``?fields=``."""
+    try:
+        fields = serializers.parse_fields(request.GET.get('fields'))
+    except serializers.FieldsError as error:
+        return _error(str(error), 400)
+    paginator = CursorPaginator(
+        serializers.project(posts, fields), POSTS_CONST
+    )
+    page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    serializers.prepare(page_obj.object_list, fields)
+    results = [serializers.post(post, fields) for post in page_obj]
+    return _json({**extra, **_page(request, page_obj, results)})
+
+
+def _comments(request, post_id, cursor):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related(
+            'author'
+        ).only(
+            'text', 'created', 'author__username', 'author__first_name',
+            'author__last_name',
+        ),
+        COMMENTS_CONST,
+        ordering=('created', 'id'),
+    )
+    page_obj = paginator.get_cursor_page(cursor)
+    return _page(
+        request, page_obj,
+        [serializers.comment(comment) for comment in page_obj],
+        path=reverse('api:post_comments', args=[post_id]),
+    )
+
+
+@condition_on_tags(cache_tags.for_index)
+def index(request):
+    return _feed(request, Post.objects.all())
+
+
+@condition_on_tags(cache_tags.for_group)
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('slug', 'title').first()
+    if group is None:
+        return _error('Группа не найдена.', 404)
+    return _feed(
+        request, Post.objects.filter(group=group),
+        group=serializers.group(group),
+    )
+
+
+@condition_on_tags(cache_tags.for_profile)
+def profile(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username
+    ).first()
+    if author is None:
+        return _error('Пользователь не найден.', 404)
+    stats = user_stats.get(author)
+    return _feed(
+        request, Post.objects.filter(author=author),
+        author={
+            **serializers.user(author),
+            **{field: getattr(stats, field) for field in user_stats.SOURCES},
+        },
+    )
+
+
+@condition_on_tags(cache_tags.for_post_detail)
+def post_detail(request, post_id):
+    """Пост с первой страницей комментариев."""
+    try:
+        fields = serializers.parse_fields(request.GET.get('fields'))
+    except serializers.FieldsError as error:
+        return _error(str(error), 400)
+    post = serializers.project(
+        Post.objects.filter(pk=post_id), fields
+    ).first()
+    if post is None:
+        return _error('Пост не найден.', 404)
+    serializers.prepare([post], fields)
+    return _json({
+        'post': serializers.post(post, fields),
+        'comments': _comments(request, post.pk, None),
+    })
+
+
+@condition_on_tags(cache_tags.for_post_detail)
+def post_comments(request, post_id):
+    """Следующие страницы комментариев поста."""
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден.', 404)
+    return _json(_comments(request, post_id, request.GET.get('cursor')))
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+
+TAG_KEY = 'tag:{}'
+
+_rendering = threading.local()
+
+
+class Fragment:
+    cacheable = True
+
+
+@contextmanager
+def fragment():
+    """Отметить рендер фрагмента, который потом ляжет в кэш."""
+    stack = _rendering.__dict__.setdefault('stack', [])
+    current = Fragment()
+    stack.append(current)
+    try:
+        yield current
+    finally:
+        stack.pop()
+
+
+def skip_caching():
+    """Не кэшировать ни один из рендерящихся сейчас фрагментов.
+
+    Нужна для временного содержимого, например заглушки вместо ещё
+    не готовой миниатюры.
+    """
+    for current in getattr(_rendering, 'stack', ()):
+        current.cacheable = False
+
+
+def new_version():
+    return time.time_ns()
+
+
+def versions(tags):
+    """Версии тегов; неизвестный тег получает свежую версию."""
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump(*tags):
+    """Сбросить всё, что закэшировано с любым из тегов."""
+    version = new_version()
+    cache.set_many({TAG_KEY.format(tag): version for tag in tags})
+
+
+def make_key(name, tags, vary_on=(), tag_versions=None):
+    """Ключ, который меняется вместе с версией любого из тегов.
+
+    Уже прочитанные версии можно передать в ``tag_versions``, чтобы
+    собрать ключи для многих фрагментов за одно обращение к кэшу.
+    """
+    if tag_versions is None:
+        tag_versions = versions(tags)
+    digest = hashlib.md5(repr((
+        list(vary_on), sorted((tag, tag_versions[tag]) for tag in tags)
+    )).encode()).hexdigest()
+    return f'tagged:{name}:{digest}'
+
+
+def get_or_set(name, tags, vary_on, default):
+    key = make_key(name, tags, vary_on)
+    value = cache.get(key)
+    if value is None:
+        with fragment() as current:
+            value = default()
+        if current.cacheable:
+            cache.set(key, value)
+    return value
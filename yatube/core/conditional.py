@@ -0,0 +1,59 @@
+import datetime
+import hashlib
+from functools import wraps
+
+from django.views.decorators.http import condition
+
+from core import cache
+
+
+def condition_on_tags(get_tags):
+    """Отвечать 304 по версиям тегов, не выполняя саму view.
+
+    ``get_tags(request, *args, **kwargs)`` возвращает теги страницы
+    или None, если страницы нет. ETag зависит от версий тегов, адреса
+    и пользователя, Last-Modified — время самой свежей версии.
+    Страница с временным содержимым (см. ``cache.skip_caching``)
+    уходит без валидаторов.
+    """
+    def tag_versions(request, *args, **kwargs):
+        if not hasattr(request, '_tag_versions'):
+            tags = get_tags(request, *args, **kwargs)
+            request._tag_versions = (
+                None if tags is None else cache.versions(tags)
+            )
+        return request._tag_versions
+
+    def etag(request, *args, **kwargs):
+        versions = tag_versions(request, *args, **kwargs)
+        if versions is None:
+            return None
+        return hashlib.md5(repr((
+            request.user.pk,
+            request.get_full_path(),
+            sorted(versions.items()),
+        )).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = tag_versions(request, *args, **kwargs)
+        if not versions:
+            return None
+        return datetime.datetime.fromtimestamp(
+            max(versions.values()) / 10 ** 9, tz=datetime.timezone.utc
+        )
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with cache.fragment() as page:
+                response = conditional_view(request, *args, **kwargs)
+            if not page.cacheable:
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,14 @@
+from django.db import connection
+
+
+def bulk_batch_size(model, batch_size):
+    """Размер пачки ``bulk_create``, который выдержит база.
+
+    Django 2.2 не уменьшает явно переданный ``batch_size`` до предела
+    базы, и SQLite падает на вставке больше 500 строк.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    return min(batch_size, connection.ops.bulk_batch_size(fields, []))
@@ -0,0 +1,124 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'REPEAT_THRESHOLD': 3,
+    'BUDGET': None,
+    'BUDGETS': {},
+    'RAISE': False,
+}
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Форма запроса: без значений и с одинаковыми списками IN."""
+    return IN_LIST.sub('(%s...)', SPACES.sub(' ', sql)).strip()
+
+
+def call_site():
+    """Место в шаблоне или в коде проекта, откуда пришёл запрос."""
+    frame = sys._getframe(2)
+    project_site = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if (
+            frame.f_code.co_name == 'render_annotated'
+            and getattr(node, 'token', None) is not None
+            and getattr(node, 'origin', None) is not None
+        ):
+            return f'{node.origin.template_name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (
+            project_site is None
+            and filename.startswith(settings.BASE_DIR)
+            and filename != __file__
+        ):
+            project_site = (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno}'
+            )
+        frame = frame.f_back
+    return project_site or '?'
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.shapes = Counter()
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        self.shapes[(fingerprint(sql), call_site())] += 1
+        return execute(sql, params, many, context)
+
+    def repeats(self, threshold):
+        return [
+            (site, sql, count)
+            for (sql, site), count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryInspectorMiddleware:
+    """Ищет повторяющиеся запросы (N+1) в dev и staging окружениях.
+
+    Запросы запроса группируются по форме SQL и месту вызова; формы,
+    повторённые не меньше ``REPEAT_THRESHOLD`` раз, пишутся в лог и в
+    заголовок ``X-Query-Repeats``. При превышении бюджета запросов
+    с включённым ``RAISE`` выбрасывается ``QueryBudgetExceeded``, что
+    роняет тест, открывший страницу.
+    """
+
+    def __init__(self, get_response):
+        self.options = {
+            **DEFAULTS, **getattr(settings, 'QUERY_INSPECTOR', {})
+        }
+        if not self.options['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        repeats = recorder.repeats(self.options['REPEAT_THRESHOLD'])
+        response['X-Query-Count'] = str(recorder.total)
+        response['X-Query-Repeats'] = str(len(repeats))
+        for site, sql, count in repeats:
+            logger.warning(
+                'Повторяющийся запрос %s раз(а) на %s из %s: %s',
+                count, request.path, site, sql[:300]
+            )
+        budget = self._budget(request)
+        if budget is not None and recorder.total > budget:
+            message = (
+                f'{request.path}: {recorder.total} запросов '
+                f'при бюджете {budget}'
+            )
+            logger.error(message)
+            if self.options['RAISE']:
+                raise QueryBudgetExceeded(message)
+        return response
+
+    def _budget(self, request):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        return self.options['BUDGETS'].get(view_name, self.options['BUDGET'])
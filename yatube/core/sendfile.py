@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Миниатюры sorl и картинки постов названы по хешу содержимого
+# и настроек, поэтому файл по такому адресу никогда не меняется.
+IMMUTABLE = re.compile(
+    r'^(?:cache|posts)/(?:[0-9a-f]{2}/)+[0-9a-f]{32,64}\.'
+)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MAX_AGE = 60 * 60
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого читается только диапазон ``[start, end]``.
+
+    ``fileno`` и позиция остаются у настоящего файла, поэтому
+    ``wsgi.file_wrapper`` (gunicorn, uWSGI) отдаёт диапазон через
+    ``os.sendfile``, а без него байты читаются кусками до ``end``.
+    """
+
+    def __init__(self, file, start, end):
+        self.file = file
+        self.name = file.name
+        self.remaining = end - start + 1
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def etag(path, stats):
+    if IMMUTABLE.match(path):
+        return '"%s"' % os.path.splitext(posixpath.basename(path))[0]
+    return '"%x-%x"' % (stats.st_mtime_ns, stats.st_size)
+
+
+def cache_control(path):
+    if IMMUTABLE.match(path):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={MAX_AGE}'
+
+
+def parse_range(header, size):
+    """Границы единственного диапазона ``bytes=``.
+
+    Для заголовка, который нельзя разобрать или который содержит
+    несколько диапазонов, возвращается None — файл отдаётся целиком.
+    Диапазон за концом файла даёт ``(size, size)``.
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = size - 1 if last == '' else min(int(last), size - 1)
+        if end < start and last != '':
+            return None
+    if start >= size or size == 0:
+        return size, size
+    return start, end
+
+
+def range_applies(request, tag, mtime):
+    """Выполнено ли условие ``If-Range``, если оно передано."""
+    condition = request.META.get('HTTP_IF_RANGE')
+    if condition is None:
+        return True
+    if condition.startswith('"'):
+        return condition == tag
+    return parse_http_date_safe(condition) == int(mtime)
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдать файл из ``MEDIA_ROOT``, не пропуская его через Python.
+
+    Способ задаёт ``MEDIA_SENDFILE``: ``'x-accel-redirect'`` отдаёт файл
+    nginx через внутренний location ``MEDIA_ACCEL_REDIRECT_URL``,
+    ``'x-sendfile'`` — Apache или lighttpd, ``'python'`` —
+    ``wsgi.file_wrapper`` сервера приложений. В последнем случае view
+    сама отвечает на ``Range``. ETag и ``Cache-Control`` ставятся
+    всегда; 304 отдаётся до обращения к серверу.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404
+    path = posixpath.normpath(path).lstrip('/')
+    tag = etag(path, stats)
+    not_modified = get_conditional_response(
+        request, etag=tag, last_modified=int(stats.st_mtime)
+    )
+    if not_modified is not None:
+        not_modified['Cache-Control'] = cache_control(path)
+        return not_modified
+
+    backend = settings.MEDIA_SENDFILE
+    if backend == 'python':
+        response = _file_response(request, fullpath, stats, tag)
+    else:
+        response = HttpResponse()
+        response['Content-Type'] = (
+            mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+        )
+        if backend == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT_URL + quote(path)
+            )
+        elif backend == 'x-sendfile':
+            response['X-Sendfile'] = fullpath
+        else:
+            raise ValueError(f'Неизвестный MEDIA_SENDFILE: {backend!r}')
+    response['ETag'] = tag
+    response['Last-Modified'] = http_date(stats.st_mtime)
+    response['Cache-Control'] = cache_control(path)
+    return response
+
+
+def _file_response(request, fullpath, stats, tag):
+    size = stats.st_size
+    bounds = None
+    header = request.META.get('HTTP_RANGE')
+    if header and range_applies(request, tag, stats.st_mtime):
+        bounds = parse_range(header, size)
+    if bounds == (size, size):
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(fullpath, 'rb')
+    if bounds is None:
+        response = FileResponse(file)
+    else:
+        start, end = bounds
+        response = FileResponse(RangeFile(file, start, end), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    return response
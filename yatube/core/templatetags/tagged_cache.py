@@ -0,0 +1,45 @@
+from django import template
+
+from core import cache
+
+register = template.Library()
+
+
+class TaggedCacheNode(template.Node):
+    def __init__(self, nodelist, name, tags, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.tags = tags
+        self.vary_on = vary_on
+
+    def render(self, context):
+        tags = self.tags.resolve(context)
+        if isinstance(tags, str):
+            tags = [tags]
+        return cache.get_or_set(
+            self.name.resolve(context),
+            tags,
+            [variable.resolve(context) for variable in self.vary_on],
+            lambda: self.nodelist.render(context),
+        )
+
+
+@register.tag
+def tagged_cache(parser, token):
+    """Кэшировать фрагмент до смены версии одного из тегов.
+
+        {% tagged_cache "имя" теги [vary_on ...] %} ... {% endtagged_cache %}
+    """
+    nodelist = parser.parse(('endtagged_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя фрагмента и теги.'
+        )
+    return TaggedCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from core.cache import bump, make_key
+from core.sendfile import parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+THUMBNAIL = 'cache/ab/cd/' + 'abcdef0123456789' * 2 + '.jpg'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_SENDFILE='python')
+class ServeMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in (THUMBNAIL, 'about.txt'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'0123456789')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, name, **headers):
+        response = self.client.get(settings.MEDIA_URL + name, **headers)
+        content = b''.join(getattr(response, 'streaming_content', []))
+        return response, content
+
+    def test_whole_file(self):
+        """Файл отдаётся целиком с валидаторами и Accept-Ranges."""
+        response, content = self.get('about.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+
+    def test_hashed_thumbnail_is_immutable(self):
+        """Миниатюра по хешу кешируется на год с ETag из имени."""
+        response, _ = self.get(THUMBNAIL)
+        self.assertEqual(
+            response['Cache-Control'],
+            'public, max-age=31536000, immutable'
+        )
+        self.assertEqual(response['ETag'], '"%s"' % ('abcdef0123456789' * 2))
+
+    def test_not_modified(self):
+        """Совпавший If-None-Match даёт 304 без тела."""
+        response, _ = self.get(THUMBNAIL)
+        response, content = self.get(
+            THUMBNAIL, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range(self):
+        """Range отдаёт только запрошенные байты."""
+        response, content = self.get('about.txt', HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(content, b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(response['Content-Length'], '3')
+
+    def test_range_with_stale_if_range(self):
+        """Устаревший If-Range отменяет Range: файл отдаётся целиком."""
+        response, content = self.get(
+            'about.txt', HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(content, b'0123456789')
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла даёт 416."""
+        response, _ = self.get('about.txt', HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_parse_range(self):
+        """Разбор заголовка Range."""
+        cases = {
+            'bytes=0-0': (0, 0),
+            'bytes=5-': (5, 9),
+            'bytes=-3': (7, 9),
+            'bytes=8-100': (8, 9),
+            'bytes=4-2': None,
+            'bytes=0-1,4-5': None,
+            'items=0-1': None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 10), expected)
+
+    def test_missing_and_outside_files(self):
+        """Несуществующие файлы, каталоги и пути вне MEDIA_ROOT — 404."""
+        for name in ('missing.jpg', 'cache/', '../manage.py'):
+            with self.subTest(name=name):
+                response, _ = self.get(name)
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """Для nginx view отдаёт только заголовки."""
+        response, _ = self.get(THUMBNAIL)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_REDIRECT_URL + THUMBNAIL
+        )
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        """Для Apache в X-Sendfile передаётся полный путь."""
+        response, _ = self.get('about.txt')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'about.txt')
+        )
+
+
+class TaggedCacheTest(TestCase):
+    def test_bump_changes_key(self):
+        """Смена версии тега меняет ключ фрагмента."""
+        key = make_key('fragment', ['tag'])
+        self.assertEqual(make_key('fragment', ['tag']), key)
+        bump('tag')
+        self.assertNotEqual(make_key('fragment', ['tag']), key)
+
+    def test_tag_versions_expire(self):
+        """Версия тега живёт не дольше TIMEOUT кэша, даже без bump()."""
+        key = make_key('fragment', ['tag'])
+        timeout = settings.CACHES['default']['TIMEOUT']
+        with mock.patch('time.time', return_value=time.time() + timeout + 1):
+            self.assertNotEqual(make_key('fragment', ['tag']), key)
@@ -0,0 +1,72 @@
+from .models import Group, Post, User
+
+INDEX = 'feed:index'
+AUTHORS = 'authors'
+GROUPS = 'groups'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def author(author_id):
+    return f'author:{author_id}'
+
+
+def profile(user_id):
+    return f'profile:{user_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def follow(user_id):
+    return f'follow:{user_id}'
+
+
+def for_post(instance):
+    """Теги всего, на что влияет пост: сам пост, автор, группа."""
+    tags = [post(instance.pk), author(instance.author_id)]
+    if instance.group_id is not None:
+        tags.append(group(instance.group_id))
+    return tags
+
+
+def for_page(page_obj, *scope_tags):
+    """Теги страницы ленты: её область и каждый показанный пост."""
+    tags = set(scope_tags)
+    for instance in page_obj:
+        tags.update(for_post(instance))
+    return sorted(tags)
+
+
+def for_index(request):
+    return [INDEX]
+
+
+def for_group(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    if group_id is None:
+        return None
+    return [group(group_id), AUTHORS]
+
+
+def for_profile(request, username):
+    user_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if user_id is None:
+        return None
+    return [author(user_id), profile(user_id), GROUPS]
+
+
+def for_post_detail(request, post_id):
+    instance = Post.objects.filter(pk=post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    if instance is None:
+        return None
+    return for_post(instance)
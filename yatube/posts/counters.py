@@ -0,0 +1,56 @@
+from django.db.models import F
+
+from .models import Follow, PostCounter
+
+ALL = 'all'
+BATCH_SIZE = 500
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def get(scope, queryset):
+    """Значение счётчика; отсутствующий считается один раз по queryset."""
+    count = PostCounter.objects.filter(
+        scope=scope
+    ).values_list('count', flat=True).first()
+    if count is None:
+        count = queryset.count()
+        PostCounter.objects.get_or_create(
+            scope=scope, defaults={'count': count}
+        )
+    return count
+
+
+def add(scopes, delta):
+    """Сдвинуть существующие счётчики; остальные посчитаются при чтении."""
+    scopes = list(scopes)
+    for start in range(0, len(scopes), BATCH_SIZE):
+        PostCounter.objects.filter(
+            scope__in=scopes[start:start + BATCH_SIZE]
+        ).update(count=F('count') + delta)
+
+
+def reset(*scopes):
+    PostCounter.objects.filter(scope__in=scopes).delete()
+
+
+def post_scopes(post):
+    """Все ленты, в которые попадает пост."""
+    scopes = [ALL, author_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    scopes.extend(feed_scope(user_id) for user_id in followers.iterator())
+    return scopes
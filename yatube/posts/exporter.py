@@ -0,0 +1,98 @@
+import csv
+import json
+
+from .models import Comment, Follow, Post
+from .paginator import CursorPaginator
+
+BATCH_SIZE = 1000
+FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+# Колонки CSV: общие для всех типов, лишние у записи остаются пустыми.
+# Формат совпадает с тем, что читает ``import_content``.
+CSV_FIELDS = (
+    'type', 'id', 'user', 'author', 'post', 'group', 'text', 'pub_date',
+    'created', 'image',
+)
+
+
+def batches(queryset, ordering, batch_size=BATCH_SIZE):
+    """Строки queryset пачками по ключу сортировки, без OFFSET.
+
+    В памяти одновременно держится не больше одной пачки, сколько бы
+    строк ни было всего.
+    """
+    paginator = CursorPaginator(queryset, batch_size, ordering=ordering)
+    page = paginator.get_cursor_page()
+    while True:
+        yield from page.object_list
+        if page.next_cursor is None:
+            return
+        page = paginator.get_cursor_page(page.next_cursor)
+
+
+def records(user, batch_size=BATCH_SIZE):
+    """Посты, комментарии и подписки пользователя записями импорта."""
+    posts = Post.objects.filter(author=user).select_related('group').only(
+        'text', 'pub_date', 'image', 'group', 'group__slug'
+    )
+    for post in batches(posts, ('-pub_date', '-id'), batch_size):
+        yield {
+            'type': 'post',
+            'id': post.pk,
+            'author': user.username,
+            'group': post.group.slug if post.group else None,
+            'text': post.text,
+            'pub_date': post.pub_date.isoformat(),
+            'image': post.image.name or None,
+        }
+    comments = Comment.objects.filter(author=user).only(
+        'post', 'text', 'created'
+    )
+    for comment in batches(comments, ('id',), batch_size):
+        yield {
+            'type': 'comment',
+            'id': comment.pk,
+            'post': comment.post_id,
+            'author': user.username,
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+    follows = (
+        Follow.objects.filter(user=user) | Follow.objects.filter(author=user)
+    ).select_related('user', 'author').only(
+        'user', 'user__username', 'author', 'author__username'
+    )
+    for follow in batches(follows, ('id',), batch_size):
+        yield {
+            'type': 'follow',
+            'user': follow.user.username,
+            'author': follow.author.username,
+        }
+
+
+def jsonl(rows):
+    for row in rows:
+        yield json.dumps(
+            row, ensure_ascii=False, separators=(',', ':')
+        ) + '\n'
+
+
+class _Line:
+    """Буфер ``csv.writer``, который сразу отдаёт записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(_Line(), CSV_FIELDS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def serialize(rows, fmt):
+    """Строки файла выгрузки в формате ``jsonl`` или ``csv``."""
+    return csv_lines(rows) if fmt == 'csv' else jsonl(rows)
@@ -0,0 +1,47 @@
+from .models import Post, TimelineEntry
+
+POST_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+def project(queryset, prefix=''):
+    """Присоединить автора и группу и загрузить только поля карточки.
+
+    ``prefix`` задаёт путь до поста, например ``'post__'`` для записей
+    ленты подписок.
+    """
+    return queryset.select_related(
+        f'{prefix}author', f'{prefix}group'
+    ).only(*(f'{prefix}{field}' for field in POST_FIELDS))
+
+
+def all_posts():
+    return project(Post.objects.all())
+
+
+def group_posts(group):
+    return project(Post.objects.filter(group=group))
+
+
+def author_posts(author):
+    return project(Post.objects.filter(author=author))
+
+
+def followed_posts(user):
+    return project(Post.objects.filter(author__following__user=user))
+
+
+def timeline_entries(user):
+    return project(
+        TimelineEntry.objects.filter(user=user), prefix='post__'
+    ).only('pub_date', 'post', *(f'post__{field}' for field in POST_FIELDS))
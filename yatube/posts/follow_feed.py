@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import make_key
+from . import cache_tags, counters, feeds, recent_posts, timeline
+from .models import Follow
+from .paginator import BACKWARD, FORWARD, CountedPaginator, paginate
+
+
+def join_page(request, per_page):
+    """Лента подписок соединением Follow и Post."""
+    return paginate(
+        request, feeds.followed_posts(request.user), per_page,
+        scope=counters.feed_scope(request.user.pk),
+    )
+
+
+def _is_complete(window, values, backward, per_page, floor):
+    """Лента из кэша точна только для ключей не старше ``floor``."""
+    if floor is None:
+        return True
+    if backward:
+        return values is not None and tuple(values) >= floor
+    return len(window) > per_page and window[-1] >= floor
+
+
+def merge_page(request, per_page):
+    """Лента подписок слиянием закэшированных списков авторов.
+
+    Записи не размножаются по подписчикам: на запрос читаются списки
+    последних постов каждого автора, сливаются кучей, а сами посты
+    загружаются одним ``in_bulk``. Если страница уходит глубже
+    закэшированных списков, используется соединение.
+    """
+    paginator = CountedPaginator(
+        feeds.followed_posts(request.user), per_page,
+        counters.feed_scope(request.user.pk),
+    )
+    cursor = request.GET.get('cursor')
+    if not cursor and request.GET.get('page') is not None:
+        return join_page(request, per_page)
+    direction, values, number = FORWARD, None, 1
+    decoded = paginator.decode_cursor(cursor) if cursor else None
+    if decoded is not None:
+        direction, values, number = decoded
+    author_ids = Follow.objects.filter(
+        user=request.user
+    ).values_list('author_id', flat=True)
+    feed, floor = recent_posts.merge(list(author_ids))
+    backward = direction == BACKWARD
+    if values is None:
+        window = feed[-per_page - 1:] if backward else feed[:per_page + 1]
+    elif backward:
+        window = [key for key in feed if key > tuple(values)]
+        window = window[-per_page - 1:]
+    else:
+        window = [key for key in feed if key < tuple(values)]
+        window = window[:per_page + 1]
+    if not _is_complete(window, values, backward, per_page, floor):
+        return join_page(request, per_page)
+    has_more = len(window) > per_page
+    window = window[1:] if backward and has_more else window[:per_page]
+    if backward:
+        has_previous, has_next = has_more, values is not None
+    else:
+        has_previous, has_next = values is not None, has_more
+    posts = paginator.object_list.in_bulk([pk for _, pk in window])
+    rows = [posts[pk] for _, pk in window if pk in posts]
+    if not has_previous:
+        number = 1
+    return paginator.build_page(rows, number, has_previous, has_next)
+
+
+ENGINES = {
+    'join': join_page,
+    'timeline': timeline.get_page,
+    'merge': merge_page,
+}
+
+
+def get_page(request, per_page, engine=None, use_cache=True):
+    """Страница ленты подписок движком из ``FOLLOW_FEED_ENGINE``.
+
+    Первые ``FOLLOW_FEED_CACHED_PAGES`` страниц кэшируются списками id
+    под тегом подписчика; при попадании в кэш база нужна только для
+    загрузки самих постов.
+    """
+    engine = engine or settings.FOLLOW_FEED_ENGINE
+    paginator = CountedPaginator(
+        feeds.followed_posts(request.user), per_page,
+        counters.feed_scope(request.user.pk),
+    )
+    key = _cache_key(request, paginator, engine) if use_cache else None
+    if key is None:
+        return ENGINES[engine](request, per_page)
+    cached = cache.get(key)
+    if cached is not None:
+        ids, number, has_previous, has_next = cached
+        posts = feeds.all_posts().in_bulk(ids)
+        rows = [posts[pk] for pk in ids if pk in posts]
+        return paginator.build_page(rows, number, has_previous, has_next)
+    page_obj = ENGINES[engine](request, per_page)
+    cache.set(key, (
+        [post.pk for post in page_obj.object_list],
+        page_obj.number,
+        page_obj.previous_cursor is not None,
+        page_obj.next_cursor is not None,
+    ))
+    return page_obj
+
+
+def _cache_key(request, paginator, engine):
+    if request.GET.get('page') is not None:
+        return None
+    cursor = request.GET.get('cursor') or ''
+    number = 1
+    if cursor:
+        decoded = paginator.decode_cursor(cursor)
+        number = decoded and decoded[2]
+    if not number or number > settings.FOLLOW_FEED_CACHED_PAGES:
+        return None
+    return make_key(
+        'follow_feed',
+        [cache_tags.follow(request.user.pk)],
+        [engine, paginator.per_page, cursor],
+    )
@@ -1,5 +1,6 @@
 from django import forms
 
+from . import images
 from .models import Comment, Post
 
 
@@ -18,6 +19,13 @@ class PostForm(forms.ModelForm):
             'image': 'Загружаемая картинка'
         }
 
+    def clean_image(self):
+        """Проверить заголовок новой картинки и уменьшить её."""
+        image = self.cleaned_data.get('image')
+        if image and 'image' in self.changed_data:
+            return images.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,74 @@
+import io
+import os
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+JPEG_QUALITY = 85
+
+
+def open_header(file):
+    """Открыть картинку, прочитав только заголовок, и проверить его.
+
+    Pillow декодирует пиксели лениво, поэтому формат и размеры
+    проверяются до того, как под картинку будет выделена память.
+    """
+    file.seek(0)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(file)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError(
+            'Слишком большая картинка.', code='image_too_large'
+        )
+    except Exception:
+        raise ValidationError(
+            'Загрузите правильное изображение.', code='invalid_image'
+        )
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError(
+            f'Формат {image.format} не поддерживается.',
+            code='invalid_image_format'
+        )
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка {width}x{height} слишком большая.',
+            code='image_too_large'
+        )
+    return image
+
+
+def normalize(file):
+    """Картинка, уменьшенная до ``POST_IMAGE_MAX_SIDE`` по большей стороне.
+
+    Подходящая по размеру картинка возвращается без перекодирования.
+    JPEG декодируется в режиме draft сразу с уменьшением в 2–8 раз,
+    поэтому пик памяти зависит от итогового размера, а не от исходного.
+    """
+    image = open_header(file)
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    if max(image.size) <= max_side:
+        file.seek(0)
+        return file
+    is_jpeg = image.format == 'JPEG'
+    if is_jpeg:
+        image.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    output = io.BytesIO()
+    if is_jpeg:
+        image.convert('RGB').save(
+            output, 'JPEG', quality=JPEG_QUALITY, optimize=True
+        )
+        extension, content_type = '.jpg', 'image/jpeg'
+    else:
+        image.save(output, 'PNG', optimize=True)
+        extension, content_type = '.png', 'image/png'
+    name = os.path.splitext(os.path.basename(file.name))[0] + extension
+    return SimpleUploadedFile(name, output.getvalue(), content_type)
@@ -0,0 +1,385 @@
+import csv
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+
+from django import forms
+from django.core.files import File
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.forms import modelform_factory
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import cache
+from core.db import bulk_batch_size
+from . import cache_tags, counters, recent_posts, timeline, user_stats
+from .forms import CommentForm, PostForm
+from .models import Comment, Follow, Group, Post, User
+from .signals import bulk_imported
+
+BATCH_SIZE = 500
+TYPES = ('group', 'post', 'comment', 'follow')
+
+PostImportForm = modelform_factory(
+    Post, form=PostForm, fields=('text', 'image')
+)
+
+
+class GroupImportForm(forms.ModelForm):
+    class Meta:
+        model = Group
+        fields = ('title', 'slug', 'description')
+
+    def validate_unique(self):
+        """Занятость slug проверяется по карте групп, без запроса."""
+
+
+class RowError(ValueError):
+    pass
+
+
+def records(file, fmt='jsonl', default_type=None):
+    """Записи входного файла по одной, не читая его целиком.
+
+    Строка, которую не удалось разобрать, отдаётся как ``RowError``,
+    чтобы нумерация записей не сбилась.
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(file):
+            row.setdefault('type', default_type)
+            yield row
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('ожидался объект')
+        except ValueError as error:
+            yield RowError(f'Не удалось разобрать JSON: {error}')
+            continue
+        record.setdefault('type', default_type)
+        yield record
+
+
+def _value(record, key):
+    """Значение поля; пустые ячейки CSV считаются отсутствующими."""
+    value = record.get(key)
+    return None if value in ('', None) else value
+
+
+def _id(record, key):
+    value = _value(record, key)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RowError(f'{key}: ожидалось целое число, получено {value!r}.')
+
+
+def _date(record, key):
+    value = _value(record, key)
+    if value is None:
+        return timezone.now()
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise RowError(f'{key}: не удалось разобрать дату {value!r}.')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _form_errors(form):
+    return '; '.join(
+        f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()
+    )
+
+
+@contextmanager
+def keep_dates():
+    """Не подменять даты из файла текущим временем (``auto_now_add``)."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Пишет записи ``group``, ``post``, ``comment`` и ``follow`` пачками.
+
+    Каждая пачка проверяется правилами форм сайта и записывается
+    ``bulk_create`` в одной транзакции. Авторы и группы ищутся по
+    картам ``username → pk`` и ``slug → pk`` в памяти. Сигналы
+    ``post_save`` при этом не срабатывают, поэтому ленты подписок,
+    счётчики, статистика, число комментариев, теги кэша и поиск
+    обновляются пачкой в конце той же транзакции. Миниатюры не
+    строятся: после импорта их строит ``pregenerate_thumbnails``.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, media_dir='.'):
+        self.batch_size = batch_size
+        self.media_dir = media_dir
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.created = Counter()
+        self.images = 0
+
+    def write(self, chunk):
+        """Записать пачку пар ``(номер, запись)``; вернуть ошибки строк."""
+        self.errors = []
+        rows = {kind: [] for kind in TYPES}
+        for number, record in chunk:
+            if isinstance(record, RowError):
+                self.errors.append((number, str(record)))
+            elif record.get('type') not in TYPES:
+                self.errors.append(
+                    (number, f'Неизвестный тип записи {record.get("type")!r}.')
+                )
+            else:
+                rows[record['type']].append((number, record))
+        with transaction.atomic(), keep_dates():
+            groups = self._write_groups(rows['group'])
+            posts = self._write_posts(rows['post'])
+            followers = timeline.fan_out_many(posts)
+            comments = self._write_comments(rows['comment'], posts)
+            follows = self._write_follows(rows['follow'])
+            for user_id, author_id in follows:
+                timeline.backfill(user_id, author_id)
+            self._update_derived(groups, posts, comments, follows, followers)
+        return self.errors
+
+    def _rows(self, rows, build):
+        """Собрать объекты; строки с ошибками пропускаются."""
+        objects = []
+        for number, record in rows:
+            try:
+                objects.append(build(record))
+            except RowError as error:
+                self.errors.append((number, str(error)))
+        return objects
+
+    def _write_groups(self, rows):
+        slugs = set()
+
+        def build(record):
+            form = GroupImportForm({
+                field: record.get(field) or ''
+                for field in GroupImportForm._meta.fields
+            })
+            if not form.is_valid():
+                raise RowError(_form_errors(form))
+            slug = form.cleaned_data['slug']
+            if slug in self.groups or slug in slugs:
+                raise RowError(f'Группа {slug} уже существует.')
+            slugs.add(slug)
+            return form.save(commit=False)
+
+        groups = self._rows(rows, build)
+        Group.objects.bulk_create(
+            groups, batch_size=bulk_batch_size(Group, self.batch_size)
+        )
+        self.groups.update(
+            Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+        )
+        self.created['group'] += len(groups)
+        return [self.groups[group.slug] for group in groups]
+
+    def _write_posts(self, rows):
+        """Посты получают ``id`` из файла, а без него — следующий свободный.
+
+        Ключи назначаются заранее, потому что ``bulk_create`` возвращает
+        их не на всех базах, а по ним строятся ленты и индекс.
+        """
+        wanted = [
+            value for value in (self._safe_id(record) for _, record in rows)
+            if value is not None
+        ]
+        taken = set(
+            Post.objects.filter(pk__in=wanted).values_list('pk', flat=True)
+        )
+        next_id = max(
+            [Post.objects.aggregate(last=Max('pk'))['last'] or 0, *wanted]
+        ) + 1
+
+        def build(record):
+            nonlocal next_id
+            post_id = _id(record, 'id')
+            if post_id in taken:
+                raise RowError(f'Пост {post_id} уже существует.')
+            if post_id is None:
+                post_id, next_id = next_id, next_id + 1
+            author_id = self._user(record, 'author')
+            group_slug = _value(record, 'group')
+            if group_slug is not None and group_slug not in self.groups:
+                raise RowError(f'Неизвестная группа {group_slug}.')
+            pub_date = _date(record, 'pub_date')
+            with self._image(record) as files:
+                form = PostImportForm(
+                    {'text': record.get('text') or ''}, files
+                )
+                if not form.is_valid():
+                    raise RowError(_form_errors(form))
+                post = form.save(commit=False)
+                image = form.cleaned_data['image']
+                if image:
+                    post.image.save(image.name, image, save=False)
+                    self.images += 1
+            taken.add(post_id)
+            post.pk = post_id
+            post.author_id = author_id
+            post.group_id = self.groups.get(group_slug)
+            post.pub_date = pub_date
+            return post
+
+        posts = self._rows(rows, build)
+        Post.objects.bulk_create(
+            posts, batch_size=bulk_batch_size(Post, self.batch_size)
+        )
+        self.created['post'] += len(posts)
+        return posts
+
+    def _write_comments(self, rows, posts):
+        wanted = {self._safe_id(record, 'post') for _, record in rows}
+        known = {post.pk for post in posts} | set(
+            Post.objects.filter(pk__in=wanted - {None}).values_list(
+                'pk', flat=True
+            )
+        )
+
+        def build(record):
+            post_id = _id(record, 'post')
+            if post_id not in known:
+                raise RowError(f'Неизвестный пост {post_id}.')
+            author_id = self._user(record, 'author')
+            created = _date(record, 'created')
+            form = CommentForm({'text': record.get('text') or ''})
+            if not form.is_valid():
+                raise RowError(_form_errors(form))
+            comment = form.save(commit=False)
+            comment.post_id = post_id
+            comment.author_id = author_id
+            comment.created = created
+            return comment
+
+        comments = self._rows(rows, build)
+        Comment.objects.bulk_create(
+            comments, batch_size=bulk_batch_size(Comment, self.batch_size)
+        )
+        self.created['comment'] += len(comments)
+        return comments
+
+    def _write_follows(self, rows):
+        pairs = set()
+
+        def build(record):
+            user_id = self._user(record, 'user')
+            author_id = self._user(record, 'author')
+            if user_id == author_id:
+                raise RowError('Нельзя подписаться на себя.')
+            pairs.add((user_id, author_id))
+            return Follow(user_id=user_id, author_id=author_id)
+
+        follows = self._rows(rows, build)
+        Follow.objects.bulk_create(
+            follows,
+            batch_size=bulk_batch_size(Follow, self.batch_size),
+            ignore_conflicts=True,
+        )
+        self.created['follow'] += len(follows)
+        return pairs
+
+    def _update_derived(self, groups, posts, comments, follows, followers):
+        """То, что для одиночных записей делают сигналы posts и search."""
+        authors = {post.author_id for post in posts}
+        post_groups = {post.group_id for post in posts} - {None}
+        commented = {comment.post_id for comment in comments}
+        followers |= {user_id for user_id, _ in follows}
+        users = authors | followers | {
+            comment.author_id for comment in comments
+        } | {author_id for _, author_id in follows}
+
+        if posts:
+            counters.reset(
+                counters.ALL,
+                *(counters.author_scope(pk) for pk in authors),
+                *(counters.group_scope(pk) for pk in post_groups),
+            )
+        counters.reset(*(counters.feed_scope(pk) for pk in followers))
+        for author_id in authors:
+            recent_posts.forget(author_id)
+        if commented:
+            comment_count = Comment.objects.filter(
+                post=OuterRef('pk')
+            ).order_by().values('post').annotate(
+                total=Count('pk')
+            ).values('total')
+            Post.objects.filter(pk__in=commented).update(
+                comment_count=Coalesce(
+                    Subquery(comment_count, output_field=IntegerField()), 0
+                )
+            )
+        if users:
+            user_stats.rebuild(User.objects.filter(pk__in=users))
+        if groups:
+            bulk_imported.send(sender=Group, pks=groups)
+        if posts:
+            bulk_imported.send(sender=Post, pks=[post.pk for post in posts])
+        tags = {
+            *(cache_tags.group(pk) for pk in post_groups | set(groups)),
+            *(cache_tags.author(pk) for pk in authors),
+            *(cache_tags.post(pk) for pk in commented),
+            *(cache_tags.profile(pk) for pk in users),
+            *(cache_tags.follow(pk) for pk in followers),
+        }
+        if posts or groups:
+            tags.add(cache_tags.INDEX)
+        if tags:
+            cache.bump(*sorted(tags))
+
+    def _user(self, record, key):
+        username = _value(record, key)
+        if username not in self.users:
+            raise RowError(f'{key}: неизвестный пользователь {username}.')
+        return self.users[username]
+
+    @staticmethod
+    def _safe_id(record, key='id'):
+        try:
+            return _id(record, key)
+        except RowError:
+            return None
+
+    @contextmanager
+    def _image(self, record):
+        """Файл картинки записи для формы; путь — от ``media_dir``."""
+        path = _value(record, 'image')
+        if path is None:
+            yield {}
+            return
+        try:
+            image = open(os.path.join(self.media_dir, path), 'rb')
+        except OSError as error:
+            raise RowError(f'image: {error.strerror}: {path}.')
+        with image:
+            yield {'image': File(image, name=os.path.basename(path))}
+
+
+def reset_sequences():
+    """Сдвинуть последовательности ключей за импортированные ``id``."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [Post])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from posts import follow_feed, timeline
+from posts.models import Follow, User
+from posts.views import POSTS_CONST
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает движки ленты подписок на реальных подписчиках.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--pages', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--engine', action='append', choices=sorted(follow_feed.ENGINES)
+        )
+
+    def handle(self, *args, **options):
+        followers = Follow.objects.values('user').distinct()
+        users = list(User.objects.filter(
+            pk__in=followers.values('user')[:options['users']]
+        ))
+        if not users:
+            self.stderr.write('Нет пользователей с подписками.')
+            return
+        for engine in options['engine'] or sorted(follow_feed.ENGINES):
+            if engine == 'timeline' and not timeline.enabled():
+                self.stderr.write(
+                    "timeline пропущен: ленты ведутся только при "
+                    "FOLLOW_FEED_ENGINE = 'timeline'."
+                )
+                continue
+            timings, queries = [], []
+            for _ in range(options['repeat']):
+                for user in users:
+                    self._walk(engine, user, options['pages'],
+                               timings, queries)
+            self.stdout.write(
+                f'{engine:>8}: {len(timings)} страниц, '
+                f'среднее {statistics.mean(timings) * 1000:.2f} мс, '
+                f'p95 {self._p95(timings) * 1000:.2f} мс, '
+                f'запросов на страницу {statistics.mean(queries):.1f}'
+            )
+
+    def _walk(self, engine, user, pages, timings, queries):
+        factory = RequestFactory()
+        cursor = None
+        for _ in range(pages):
+            request = factory.get('/follow/', {'cursor': cursor or ''})
+            request.user = user
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                page_obj = follow_feed.get_page(
+                    request, POSTS_CONST, engine, use_cache=False
+                )
+                timings.append(time.perf_counter() - started)
+            queries.append(len(captured))
+            cursor = page_obj.next_cursor
+            if cursor is None:
+                break
+
+    @staticmethod
+    def _p95(values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,152 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts import media
+from posts.storage import post_images
+
+BATCH_SIZE = 500
+PHASES = ('originals', 'sources', 'thumbnails')
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит и удаляет картинки постов, миниатюры и записи sorl, '
+        'на которые больше не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что было бы удалено.'
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе этого числа секунд.'
+        )
+        parser.add_argument(
+            '--state-file',
+            help='Файл с прогрессом: прерванный запуск продолжится с места '
+                 'остановки.'
+        )
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        self.newest = time.time() - options['min_age']
+        self.state_file = options['state_file']
+        self.state = self.load_state()
+        for phase in PHASES:
+            if self.state.get(phase) is True:
+                continue
+            found = getattr(self, f'collect_{phase}')(self.state.get(phase))
+            self.save_state(phase, True)
+            action = 'Найдено' if self.dry_run else 'Удалено'
+            self.stdout.write(f'{action} ({phase}): {found}')
+        if self.state_file and not self.dry_run:
+            os.remove(self.state_file)
+
+    def collect_originals(self, after):
+        """Оригиналы в ``posts/``, на которые не ссылается ни один пост."""
+        found = 0
+        files = media.walk(post_images, 'posts', after)
+        for batch in batches(files, self.batch_size):
+            names = [name for name, entry in batch if self.is_old(entry)]
+            kept = media.referenced(names)
+            for name in names:
+                if name not in kept:
+                    found += self.remove(
+                        name, lambda: media.delete_unreferenced(name)
+                    )
+            self.save_state('originals', batch[-1][0])
+        return found
+
+    def collect_sources(self, after):
+        """Записи sorl об исходных картинках без ссылающихся постов."""
+        prefix = add_prefix('')
+        entries = KVStoreModel.objects.filter(
+            key__startswith=prefix
+        ).order_by('key').values_list('key', 'value')
+        found, after = 0, after or prefix
+        while True:
+            batch = list(entries.filter(key__gt=after)[:self.batch_size])
+            if not batch:
+                return found
+            sources = {}
+            for _, value in batch:
+                image_file = deserialize_image_file(value)
+                if not image_file.name.startswith(
+                    sorl_settings.THUMBNAIL_PREFIX
+                ):
+                    sources[image_file.name] = image_file
+            kept = media.referenced(list(sources))
+            for name, image_file in sources.items():
+                if name not in kept:
+                    found += self.remove(
+                        name, lambda: default.kvstore.delete(image_file)
+                    )
+            after = batch[-1][0]
+            self.save_state('sources', after)
+
+    def collect_thumbnails(self, after):
+        """Файлы миниатюр, о которых не знает хранилище sorl."""
+        found = 0
+        top = sorl_settings.THUMBNAIL_PREFIX.strip('/')
+        files = media.walk(default.storage, top, after)
+        for batch in batches(files, self.batch_size):
+            keys = {
+                add_prefix(ImageFile(name, default.storage).key): name
+                for name, entry in batch if self.is_old(entry)
+            }
+            known = set(KVStoreModel.objects.filter(
+                key__in=list(keys)
+            ).values_list('key', flat=True))
+            for key, name in keys.items():
+                if key not in known:
+                    found += self.remove(
+                        name, lambda: default.storage.delete(name)
+                    )
+            self.save_state('thumbnails', batch[-1][0])
+        return found
+
+    def remove(self, name, delete):
+        if self.verbosity > 1:
+            self.stdout.write(name)
+        if self.dry_run:
+            return 1
+        return 0 if delete() is False else 1
+
+    def is_old(self, entry):
+        return entry.stat().st_mtime < self.newest
+
+    def load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file) as state_file:
+                return json.load(state_file)
+        return {}
+
+    def save_state(self, phase, position):
+        if not self.state_file or self.dry_run:
+            return
+        self.state[phase] = position
+        with open(self.state_file, 'w') as state_file:
+            json.dump(self.state, state_file)
@@ -0,0 +1,44 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+
+from core import cache
+from posts import cache_tags, media, thumbnails
+from posts.models import Post
+from posts.storage import post_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов под имена по хешу содержимого, '
+        'объединяя одинаковые файлы.'
+    )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct().order_by('image')
+        moved = removed = 0
+        for name in list(names):
+            if post_images.is_hashed(name) or not self.stored(name):
+                continue
+            with post_images.open(name) as content:
+                new_name = post_images.save(name, content)
+            posts = Post.objects.filter(image=name)
+            post_ids = list(posts.values_list('pk', flat=True))
+            posts.update(image=new_name)
+            cache.bump(*(cache_tags.post(pk) for pk in post_ids))
+            moved += 1
+            removed += media.delete_unreferenced(name)
+            post = Post.objects.filter(image=new_name).first()
+            if thumbnails.missing(post.image):
+                thumbnails.generate(new_name)
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, удалено дубликатов: {removed}'
+        )
+
+    @staticmethod
+    def stored(name):
+        try:
+            return post_images.exists(name)
+        except SuspiciousFileOperation:
+            return False
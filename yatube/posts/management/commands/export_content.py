@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и подписки пользователя в JSONL '
+        'или CSV, читая их пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=tuple(exporter.FORMATS), default='jsonl'
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл выгрузки; «-» — stdout.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=exporter.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        lines = exporter.serialize(
+            exporter.records(user, options['batch_size']), options['format']
+        )
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(
+            options['output'], 'w', newline='', encoding='utf-8'
+        ) as output:
+            output.writelines(lines)
@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты, комментарии и подписки из JSONL '
+        'или CSV пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL или CSV; «-» — stdin.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument(
+            '--type', choices=importer.TYPES,
+            help='Тип записей без поля type, например для CSV.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Записей в одной транзакции.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Строк в одном INSERT.'
+        )
+        parser.add_argument(
+            '--media-dir', default='.',
+            help='Каталог, от которого отсчитываются пути картинок.'
+        )
+        parser.add_argument(
+            '--state-file',
+            help='Файл с прогрессом: после сбоя импорт продолжится '
+                 'с первой незаписанной пачки.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        self.state_file = options['state_file']
+        done = self.load_state()
+        writer = importer.Importer(
+            batch_size=options['batch_size'], media_dir=options['media_dir']
+        )
+        if path == '-':
+            file = sys.stdin
+        else:
+            try:
+                file = open(path, newline='', encoding='utf-8')
+            except OSError as error:
+                raise CommandError(error)
+        started, written, rejected = time.monotonic(), 0, 0
+        with file:
+            rows = enumerate(
+                importer.records(file, fmt, options['type']), start=1
+            )
+            rows = islice(rows, done, None)
+            while True:
+                chunk = list(islice(rows, options['chunk_size']))
+                if not chunk:
+                    break
+                for number, message in writer.write(chunk):
+                    rejected += 1
+                    self.stderr.write(f'Запись {number}: {message}')
+                done = chunk[-1][0]
+                written += len(chunk)
+                self.save_state(done)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'Записей: {done} ({written / elapsed:.0f} в секунду)'
+                )
+        importer.reset_sequences()
+        if self.state_file and os.path.exists(self.state_file):
+            os.remove(self.state_file)
+        created = ', '.join(
+            f'{kind}: {writer.created[kind]}' for kind in importer.TYPES
+        )
+        self.stdout.write(
+            f'Создано — {created}; отклонено: {rejected}; '
+            f'за {time.monotonic() - started:.1f} с.'
+        )
+        if writer.images:
+            self.stdout.write(
+                f'Картинок: {writer.images}; миниатюры построит '
+                f'pregenerate_thumbnails.'
+            )
+
+    def load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file) as state_file:
+                return json.load(state_file)['done']
+        return 0
+
+    def save_state(self, done):
+        if self.state_file:
+            with open(self.state_file, 'w') as state_file:
+                json.dump({'done': done}, state_file)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит недостающие миниатюры изображений постов '
+        'во всех ширинах и форматах.'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('image').order_by('pk')
+        generated = 0
+        for post in posts.iterator():
+            if thumbnails.missing(post.image):
+                thumbnails.generate(post.image.name, post.pk)
+                generated += 1
+        self.stdout.write(f'Построено миниатюр для постов: {generated}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит заново ленты подписок движка timeline; при другом '
+        'FOLLOW_FEED_ENGINE очищает их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=timeline.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = timeline.rebuild(batch_size=options['batch_size'])
+        if timeline.enabled():
+            self.stdout.write(f'Лент построено по подпискам: {rebuilt}')
+        else:
+            self.stdout.write('Движок не timeline: ленты очищены.')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import user_stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает UserStats по постам, комментариям и подпискам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=user_stats.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = user_stats.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Пересчитано пользователей: {rebuilt}')
@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from posts import importer, seed
+from posts.models import Post, User
+from posts.signals import bulk_imported
+
+CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами '
+        'с картинками, комментариями и подписками; с одним --seed данные '
+        'всегда одинаковые.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько разных картинок нарисовать для постов.'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты постов.'
+        )
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Начало имён пользователей и slug групп.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        data = seed.Seed(
+            seed=options['seed'], users=options['users'],
+            groups=options['groups'], posts=options['posts'],
+            comments=options['comments'], follows=options['follows'],
+            images=options['images'], image_ratio=options['image_ratio'],
+            days=options['days'], prefix=options['prefix'],
+        )
+        if User.objects.filter(username=data.username(0)).exists():
+            raise CommandError(
+                f'Пользователь {data.username(0)} уже есть: укажите '
+                f'другой --prefix или начните с пустой базы.'
+            )
+        self.started = time.monotonic()
+        self.create_users(data, options['batch_size'])
+        directory = tempfile.mkdtemp()
+        try:
+            images = data.images(directory)
+            writer = importer.Importer(
+                batch_size=options['batch_size'], media_dir=directory
+            )
+            first_post_id = (
+                Post.objects.aggregate(last=Max('pk'))['last'] or 0
+            ) + 1
+            self.write(
+                writer, data.records(first_post_id, images),
+                options['chunk_size']
+            )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        importer.reset_sequences()
+        created = ', '.join(
+            f'{kind}: {writer.created[kind]}' for kind in importer.TYPES
+        )
+        self.stdout.write(
+            f'Создано — user: {options["users"]}, {created} '
+            f'за {time.monotonic() - self.started:.1f} с.'
+        )
+        if writer.images:
+            self.stdout.write(
+                f'Картинок: {writer.images}; миниатюры построит '
+                f'pregenerate_thumbnails.'
+            )
+
+    def create_users(self, data, batch_size):
+        users = data.users()
+        while True:
+            batch = list(islice(users, batch_size))
+            if not batch:
+                return
+            User.objects.bulk_create(batch)
+            pks = list(User.objects.filter(
+                username__in=[user.username for user in batch]
+            ).values_list('pk', flat=True))
+            bulk_imported.send(sender=User, pks=pks)
+
+    def write(self, writer, records, chunk_size):
+        rows = enumerate(records, start=1)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            for number, message in writer.write(chunk):
+                self.stderr.write(f'Запись {number}: {message}')
+            elapsed = time.monotonic() - self.started
+            self.stdout.write(
+                f'Записей: {chunk[-1][0]} '
+                f'({chunk[-1][0] / elapsed:.0f} в секунду)'
+            )
@@ -0,0 +1,84 @@
+import os
+import time
+
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+from .storage import post_images
+
+# Файл моложе этого числа секунд могла только что переиспользовать
+# параллельная загрузка, чей пост ещё не закоммичен. ``release`` такие
+# файлы не удаляет: если ссылок так и не появится, их уберёт
+# ``collect_media_garbage``.
+RELEASE_MIN_AGE = 600
+
+
+def references(name):
+    """Сколько постов ссылается на файл."""
+    return Post.objects.filter(image=name).count()
+
+
+def referenced(names):
+    """Те из имён, на которые ссылается хотя бы один пост."""
+    return set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+
+
+def walk(storage, top, after=None):
+    """Файлы ``storage`` под ``top`` по порядку имён, начиная после ``after``.
+
+    Отдаёт пары ``(имя, os.DirEntry)``; в памяти держится только
+    листинг текущего каталога, а каталоги, целиком лежащие до ``after``,
+    не читаются.
+    """
+    after = tuple(after.split('/')) if after else ()
+
+    def scan(parts):
+        with os.scandir(storage.path('/'.join(parts))) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            current = parts + (entry.name,)
+            if entry.is_dir():
+                if current >= after[:len(current)]:
+                    yield from scan(current)
+            elif current > after:
+                yield '/'.join(current), entry
+
+    if storage.exists(top):
+        yield from scan(tuple(top.strip('/').split('/')))
+
+
+def release(name):
+    """Удалить файл и его миниатюры, если на него больше не ссылаются.
+
+    Проверка выполняется после коммита, чтобы не удалить файл, который
+    параллельная транзакция только что привязала к посту. Файлы со
+    старыми, не хешированными именами не трогаются: их переносит
+    команда ``dedupe_post_images``.
+    """
+    if name and post_images.is_hashed(name):
+        transaction.on_commit(
+            lambda: delete_unreferenced(name, RELEASE_MIN_AGE)
+        )
+
+
+def modified_within(name, seconds):
+    try:
+        modified = os.path.getmtime(post_images.path(name))
+    except OSError:
+        return False
+    return time.time() - modified < seconds
+
+
+def delete_unreferenced(name, min_age=0):
+    if min_age and modified_within(name, min_age):
+        return False
+    if references(name):
+        return False
+    image_file = ImageFile(name, post_images)
+    default.kvstore.delete(image_file)
+    image_file.delete()
+    return True
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import post_images
+
 User = get_user_model()
 
 
@@ -44,15 +46,36 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images,
         blank=True,
-        null=True
+        null=True,
+        db_index=True
+    )
+    comment_count = models.IntegerField(
+        'Комментариев',
+        default=0,
+        editable=False
     )
 
     def __str__(self):
         return self.text
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -77,6 +100,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -100,3 +129,66 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_follower'
             )
         ]
+
+
+class PostCounter(models.Model):
+    """Счётчик постов в ленте: общей, группы, автора или подписок."""
+    scope = models.CharField(max_length=64, unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.scope}: {self.count}'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые иначе считались бы на каждый запрос."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.IntegerField('Постов', default=0)
+    comments_count = models.IntegerField('Комментариев', default=0)
+    followers_count = models.IntegerField('Подписчиков', default=0)
+    following_count = models.IntegerField('Подписок', default=0)
+
+    def __str__(self):
+        return f'Статистика {self.user_id}'
+
+
+class TimelineEntry(models.Model):
+    """Запись ленты подписок, разложенная на каждого подписчика."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+        ]
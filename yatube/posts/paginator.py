@@ -0,0 +1,247 @@
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import counters
+
+FORWARD = 'n'
+BACKWARD = 'p'
+ELLIPSIS = '…'
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки без COUNT и OFFSET.
+
+    Страница выбирается условием по последнему показанному ключу
+    (например, ``(pub_date, id)``), поэтому стоимость запроса не зависит
+    от глубины. Курсоры передаются в шаблон непрозрачными токенами
+    ``page_obj.next_cursor`` и ``page_obj.previous_cursor``.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), **kwargs):
+        self.ordering = tuple(ordering)
+        self.keys = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+
+    def encode_cursor(self, obj, direction, number=None):
+        values = None
+        if obj is not None:
+            values = [
+                self._field(name).value_to_string(obj)
+                for name, _ in self.keys
+            ]
+        data = json.dumps(
+            [direction, values, number], separators=(',', ':')
+        )
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    @property
+    def last_cursor(self):
+        """Токен последней страницы: обход с конца без условия."""
+        return self.encode_cursor(None, BACKWARD)
+
+    def decode_cursor(self, cursor):
+        """Вернуть направление, значения ключа и номер страницы.
+
+        Для испорченного токена возвращается None.
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            direction, values, number = json.loads(
+                base64.urlsafe_b64decode(cursor + padding)
+            )
+            if direction not in (FORWARD, BACKWARD):
+                raise ValueError
+            if number is not None and (
+                type(number) is not int or number < 1
+            ):
+                raise ValueError
+            if values is not None:
+                if len(values) != len(self.keys):
+                    raise ValueError
+                values = [
+                    self._field(name).to_python(value)
+                    for (name, _), value in zip(self.keys, values)
+                ]
+        except Exception:
+            return None
+        return direction, values, number
+
+    def get_cursor_page(self, cursor=None):
+        """Вернуть страницу по токену; без токена — первую страницу."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._keyset_page(FORWARD, None, 1)
+        return self._keyset_page(*decoded)
+
+    def build_page(self, rows, number, has_previous, has_next):
+        """Собрать страницу из готовых строк и проставить курсоры."""
+        page = Page(rows, number, self)
+        page.previous_cursor = page.next_cursor = None
+        if rows and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                rows[0], BACKWARD, number and number - 1
+            )
+        if rows and has_next:
+            page.next_cursor = self.encode_cursor(
+                rows[-1], FORWARD, number and number + 1
+            )
+        page.page_links = self.page_links(page)
+        return page
+
+    def page_links(self, page):
+        """Ссылки на номера страниц; без общего числа страниц их нет."""
+        return []
+
+    def _get_page(self, object_list, number, paginator):
+        """Страница по номеру (OFFSET) тоже получает курсоры соседей."""
+        return self.build_page(
+            list(object_list), number, number > 1, number < self.num_pages
+        )
+
+    def _keyset_page(self, direction, values, number):
+        backward = direction == BACKWARD
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._keyset_filter(values, backward))
+        if backward:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backward:
+            rows.reverse()
+            has_previous, has_next = has_more, values is not None
+        else:
+            has_previous, has_next = values is not None, has_more
+        if not has_previous:
+            number = 1
+        return self.build_page(rows, number, has_previous, has_next)
+
+    def _keyset_filter(self, values, backward):
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backward else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for (previous, _), value in zip(self.keys[:index], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def _field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+
+class CountedPaginator(CursorPaginator):
+    """Курсорный paginator, число записей которого берётся из счётчика.
+
+    ``count`` читает одну строку ``PostCounter`` вместо ``COUNT(*)``,
+    а ссылки на номера страниц ограничены окрестностью текущей.
+    """
+
+    def __init__(self, object_list, per_page, scope, count=None, **kwargs):
+        self.scope = scope
+        self.known_count = count
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return counters.get(self.scope, self.object_list)
+
+    @cached_property
+    def last_cursor(self):
+        """Токен последней страницы с теми же постами, что ``?page=N``.
+
+        Это курсор вперёд от последней строки предпоследней страницы.
+        Её ключ читается с конца списка со смещением не больше
+        ``per_page``, а не OFFSET от начала. Обход с конца без условия
+        дал бы ``per_page`` последних строк, и номера страниц при
+        движении назад разошлись бы с ``?page=``.
+        """
+        if self.num_pages < 2:
+            return super().last_cursor
+        tail = self.count - (self.num_pages - 1) * self.per_page
+        anchor = list(
+            self.object_list.reverse().select_related(None).only(
+                *(name for name, _ in self.keys)
+            )[tail:tail + 1]
+        )
+        if not anchor:
+            return super().last_cursor
+        return self.encode_cursor(anchor[0], FORWARD, self.num_pages)
+
+    def get_elided_page_range(self, number, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг текущей и по краям, пропуски — ``…``."""
+        number = min(max(int(number), 1), self.num_pages)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def page_links(self, page):
+        """Пары ``(номер, query string)`` для шаблона.
+
+        Первая, последняя и соседние страницы открываются курсором,
+        остальные близкие к текущей — номером.
+        """
+        if page.number is None or self.num_pages < 2:
+            return []
+        cursors = {
+            1: '',
+            page.number - 1: page.previous_cursor and (
+                f'cursor={page.previous_cursor}'
+            ),
+            page.number + 1: page.next_cursor and (
+                f'cursor={page.next_cursor}'
+            ),
+        }
+        links = []
+        for number in self.get_elided_page_range(page.number):
+            query = None
+            if number != ELLIPSIS and number != page.number:
+                query = cursors.get(number)
+                if query is None and number == self.num_pages:
+                    query = f'cursor={self.last_cursor}'
+                if query is None:
+                    query = f'page={number}'
+            links.append((number, query))
+        return links
+
+
+def paginate(request, object_list, per_page, scope=None, **kwargs):
+    """Страница для запроса: ``?cursor=`` или устаревший ``?page=``.
+
+    Со ``scope`` число страниц берётся из счётчика постов, если оно
+    не передано готовым в ``count``.
+    """
+    if scope is None:
+        paginator = CursorPaginator(object_list, per_page, **kwargs)
+    else:
+        paginator = CountedPaginator(object_list, per_page, scope, **kwargs)
+    cursor = request.GET.get('cursor')
+    page_number = request.GET.get('page')
+    if not cursor and page_number is not None:
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(cursor)
@@ -0,0 +1,87 @@
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+KEY = 'posts:recent:{}'
+BATCH_SIZE = 500
+
+
+def _key(author_id):
+    return KEY.format(author_id)
+
+
+def push(post):
+    """Добавить новый пост в закэшированный список автора."""
+    key = _key(post.author_id)
+    recent = cache.get(key)
+    if recent is None:
+        return
+    recent = sorted(recent + [(post.pub_date, post.pk)], reverse=True)
+    cache.set(key, recent[:settings.FOLLOW_FEED_RECENT_POSTS])
+
+
+def forget(author_id):
+    cache.delete(_key(author_id))
+
+
+def get_many(author_ids):
+    """Списки ``(pub_date, id)`` последних постов для каждого автора."""
+    keys = {_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    lists = {keys[key]: value for key, value in found.items()}
+    missing = [
+        author_id for key, author_id in keys.items() if key not in found
+    ]
+    for start in range(0, len(missing), BATCH_SIZE):
+        loaded = _load(missing[start:start + BATCH_SIZE])
+        lists.update(loaded)
+        cache.set_many({
+            _key(author_id): recent for author_id, recent in loaded.items()
+        })
+    return lists
+
+
+def _load(author_ids):
+    """Последние посты авторов одним запросом ``UNION ALL``.
+
+    Каждая часть — выборка одного автора с LIMIT по индексу
+    ``(author, -pub_date, -id)``, так что запрос не читает старые посты.
+    ORM Django 2.2 на SQLite не объединяет выборки с LIMIT, поэтому
+    части оборачиваются во вложенные SELECT вручную.
+    """
+    limit = settings.FOLLOW_FEED_RECENT_POSTS
+    parts, params = [], []
+    for index, author_id in enumerate(author_ids):
+        sql, part_params = Post.objects.filter(
+            author_id=author_id
+        ).order_by('-pub_date', '-id').values(
+            'id', 'author_id', 'pub_date'
+        )[:limit].query.sql_with_params()
+        parts.append(f'SELECT * FROM ({sql}) recent_{index}')
+        params.extend(part_params)
+    lists = {author_id: [] for author_id in author_ids}
+    for post in Post.objects.raw(' UNION ALL '.join(parts), params):
+        lists[post.author_id].append((post.pub_date, post.pk))
+    for recent in lists.values():
+        recent.sort(reverse=True)
+    return lists
+
+
+def merge(author_ids):
+    """Слить списки авторов в одну ленту по убыванию ``(pub_date, id)``.
+
+    Возвращает ленту и нижнюю границу, до которой она полна: у списков,
+    обрезанных по лимиту, более старые посты в кэш не попали.
+    """
+    lists = get_many(author_ids).values()
+    floor = max(
+        (
+            recent[-1] for recent in lists
+            if len(recent) >= settings.FOLLOW_FEED_RECENT_POSTS
+        ),
+        default=None,
+    )
+    return list(heapq.merge(*lists, reverse=True)), floor
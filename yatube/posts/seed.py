@@ -0,0 +1,164 @@
+import datetime
+import os
+import random
+from bisect import bisect_left
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from .models import User
+
+START = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+SENTENCES = 2000
+IMAGE_SIZES = ((640, 480), (1280, 720), (1920, 1080), (1080, 1080))
+
+
+class Zipf:
+    """Выбор номера ``0..n-1`` с вероятностью, убывающей как ``1/k^s``.
+
+    Так распределены и подписчики, и активность авторов: немногие
+    популярные пользователи и длинный хвост остальных.
+    """
+
+    def __init__(self, n, exponent=1.0):
+        self.weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, n + 1)
+        ))
+
+    def __call__(self, rng):
+        return bisect_left(self.weights, rng.random() * self.weights[-1])
+
+
+class Seed:
+    """Детерминированный набор данных: тот же ``seed`` — те же строки.
+
+    Пользователи создаются напрямую, остальное отдаётся записями
+    ``import_content`` и пишется ``posts.importer.Importer``.
+    """
+
+    def __init__(self, seed=0, users=1000, groups=20, posts=10000,
+                 comments=20000, follows=20000, images=20,
+                 image_ratio=0.2, days=365, prefix='seed'):
+        self.seed = seed
+        self.counts = {
+            'users': users, 'groups': groups, 'posts': posts,
+            'comments': comments, 'follows': follows, 'images': images,
+        }
+        self.image_ratio = image_ratio if images else 0
+        self.span = datetime.timedelta(days=days)
+        self.prefix = prefix
+        fake = self.fake('sentences')
+        self.sentences = [fake.sentence(nb_words=10) for _ in range(SENTENCES)]
+
+    def rng(self, stage):
+        """Отдельный генератор на этап: этапы не сдвигают друг друга."""
+        return random.Random(f'{self.seed}:{stage}')
+
+    def fake(self, stage):
+        fake = Faker('ru_RU')
+        fake.seed_instance(f'{self.seed}:{stage}')
+        return fake
+
+    def username(self, index):
+        return f'{self.prefix}{index}'
+
+    def users(self):
+        """Несохранённые пользователи без пароля для входа."""
+        fake = self.fake('users')
+        for index in range(self.counts['users']):
+            yield User(
+                username=self.username(index),
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                password=UNUSABLE_PASSWORD_PREFIX,
+                date_joined=START,
+            )
+
+    def images(self, directory):
+        """Нарисовать пул картинок; посты ссылаются на них по кругу."""
+        rng = self.rng('images')
+        names = []
+        for index in range(self.counts['images']):
+            size = rng.choice(IMAGE_SIZES)
+            image = Image.new('RGB', size, self._color(rng))
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = rng.randrange(size[0]), rng.randrange(size[1])
+                draw.rectangle(
+                    (x, y, x + rng.randrange(size[0] // 2),
+                     y + rng.randrange(size[1] // 2)),
+                    fill=self._color(rng),
+                )
+            name = f'{self.prefix}-{index}.jpg'
+            image.save(os.path.join(directory, name), 'JPEG', quality=85)
+            names.append(name)
+        return names
+
+    def records(self, first_post_id, images=()):
+        """Группы, подписки, затем посты вперемешку с комментариями.
+
+        Подписки идут до постов, чтобы ленты подписчиков заполнялись
+        одним запросом на пачку постов, а не отдельно на каждую
+        подписку. Авторы постов и авторы в подписках выбираются
+        по закону Ципфа, подписчики и комментаторы — равномерно.
+        """
+        counts = self.counts
+        rng, fake = self.rng('records'), self.fake('records')
+        for index in range(counts['groups']):
+            yield {
+                'type': 'group',
+                'slug': f'{self.prefix}-{index}',
+                'title': fake.catch_phrase()[:200],
+                'description': rng.choice(self.sentences),
+            }
+        popular = Zipf(counts['users'])
+        # Активность авторов распределена так же, но независимо от числа
+        # подписчиков: иначе самый плодовитый автор был бы и самым
+        # популярным, и ленты подписок росли бы квадратично.
+        active = list(range(counts['users']))
+        rng.shuffle(active)
+        for _ in range(counts['follows'] if counts['users'] > 1 else 0):
+            author = popular(rng)
+            user = rng.randrange(counts['users'] - 1)
+            yield {
+                'type': 'follow',
+                'user': self.username(user + (user >= author)),
+                'author': self.username(author),
+            }
+        step = self.span / max(counts['posts'], 1)
+        owed = 0
+        for index in range(counts['posts']):
+            post_id = first_post_id + index
+            pub_date = START + step * index
+            post = {
+                'type': 'post',
+                'id': post_id,
+                'author': self.username(active[popular(rng)]),
+                'text': ' '.join(rng.choices(
+                    self.sentences, k=rng.randint(1, 6)
+                )),
+                'pub_date': pub_date.isoformat(),
+            }
+            if counts['groups'] and rng.random() < 0.7:
+                post['group'] = (
+                    f'{self.prefix}-{rng.randrange(counts["groups"])}'
+                )
+            if images and rng.random() < self.image_ratio:
+                post['image'] = images[index % len(images)]
+            yield post
+            owed += counts['comments']
+            while owed >= counts['posts']:
+                owed -= counts['posts']
+                yield {
+                    'type': 'comment',
+                    'post': rng.randint(first_post_id, post_id),
+                    'author': self.username(rng.randrange(counts['users'])),
+                    'text': rng.choice(self.sentences),
+                    'created': (pub_date + step * rng.random()).isoformat(),
+                }
+
+    @staticmethod
+    def _color(rng):
+        return tuple(rng.randrange(256) for _ in range(3))
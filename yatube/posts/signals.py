@@ -0,0 +1,159 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from core import cache
+from . import cache_tags, counters, media, recent_posts, timeline, user_stats
+from .models import Comment, Follow, Group, Post, User
+
+# Отправляется после bulk_create, который обходит post_save: sender —
+# модель, pks — первичные ключи созданных строк.
+bulk_imported = Signal(providing_args=['pks'])
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    cache.bump(cache_tags.INDEX, *cache_tags.for_post(instance))
+    if created:
+        _bump_followers(instance.author_id)
+        timeline.fan_out(instance)
+        recent_posts.push(instance)
+        counters.add(counters.post_scopes(instance), 1)
+        user_stats.bump([(instance.author_id, 'posts_count')], 1)
+        return
+    previous_image = getattr(instance, '_previous_image', None)
+    if previous_image and previous_image != instance.image.name:
+        media.release(previous_image)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id is not None:
+            cache.bump(cache_tags.group(previous_group_id))
+            counters.add([counters.group_scope(previous_group_id)], -1)
+        if instance.group_id is not None:
+            counters.add([counters.group_scope(instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    media.release(instance.image.name)
+    cache.bump(cache_tags.INDEX, *cache_tags.for_post(instance))
+    _bump_followers(instance.author_id)
+    recent_posts.forget(instance.author_id)
+    counters.add(counters.post_scopes(instance), -1)
+    user_stats.bump([(instance.author_id, 'posts_count')], -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        cache.bump(*_comment_tags(instance))
+        user_stats.bump([(instance.author_id, 'comments_count')], 1)
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    cache.bump(*_comment_tags(instance))
+    user_stats.bump([(instance.author_id, 'comments_count')], -1)
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump(
+            cache_tags.INDEX, cache_tags.GROUPS, cache_tags.group(instance.pk)
+        )
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    cache.bump(
+        cache_tags.INDEX, cache_tags.GROUPS, cache_tags.group(instance.pk)
+    )
+    counters.reset(counters.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    cache.bump(
+        cache_tags.INDEX, cache_tags.AUTHORS, cache_tags.author(instance.pk)
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.bump(cache_tags.author(instance.pk))
+    counters.reset(
+        counters.author_scope(instance.pk), counters.feed_scope(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        cache.bump(*_follow_tags(instance))
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.reset(counters.feed_scope(instance.user_id))
+        user_stats.bump(_follow_stats(instance), 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    cache.bump(*_follow_tags(instance))
+    timeline.prune(instance.user_id, instance.author_id)
+    counters.reset(counters.feed_scope(instance.user_id))
+    user_stats.bump(_follow_stats(instance), -1)
+
+
+def _bump_followers(author_id):
+    """Сбросить кэш лент всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    cache.bump(*(cache_tags.follow(user_id) for user_id in followers))
+
+
+def _comment_tags(comment):
+    """Число комментариев видно в лентах, поэтому сбрасываются и они."""
+    tags = [cache_tags.INDEX, cache_tags.profile(comment.author_id)]
+    post = Post.objects.filter(pk=comment.post_id).only(
+        'author_id', 'group_id'
+    ).first()
+    if post is None:
+        return tags + [cache_tags.post(comment.post_id)]
+    return tags + cache_tags.for_post(post)
+
+
+def _follow_tags(follow):
+    return [
+        cache_tags.follow(follow.user_id),
+        cache_tags.profile(follow.user_id),
+        cache_tags.profile(follow.author_id),
+    ]
+
+
+def _follow_stats(follow):
+    return [
+        (follow.author_id, 'followers_count'),
+        (follow.user_id, 'following_count'),
+    ]
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_LENGTH = 64
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 содержимого.
+
+    ``posts/кот.jpg`` сохраняется как ``posts/ab/abcd…ef.jpg``; повторная
+    загрузка тех же байтов не пишет новый файл, а возвращает имя уже
+    сохранённого, поэтому посты делят и файл, и его миниатюры.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        try:
+            # Повторное использование обновляет mtime: свежий файл не
+            # удалит ни ``media.release``, ни ``collect_media_garbage``,
+            # пока ссылающийся на него пост ещё не закоммичен.
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        # Те же байты могут параллельно записывать два запроса. Запись
+        # идёт во временный файл с уникальным именем и атомарно
+        # переименовывается: иначе ``FileSystemStorage._save`` на занятом
+        # имени без конца спрашивал бы ``get_available_name``.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.part', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    @staticmethod
+    def hashed_name(name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        hexdigest = digest.hexdigest()
+        return posixpath.join(
+            directory, hexdigest[:2], f'{hexdigest}{extension}'
+        )
+
+    @staticmethod
+    def is_hashed(name):
+        stem = os.path.splitext(posixpath.basename(name))[0]
+        return len(stem) == HASHED_NAME_LENGTH and all(
+            letter in '0123456789abcdef' for letter in stem
+        )
+
+
+post_images = ContentAddressedStorage()
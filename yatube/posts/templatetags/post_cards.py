@@ -0,0 +1,41 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.cache import fragment, make_key, versions
+from posts import cache_tags, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, template_name='includes/post_card.html'):
+    """HTML карточек постов страницы, по возможности из кэша.
+
+    Версии тегов и готовые карточки читаются двумя ``get_many``,
+    рендерятся только карточки, которых в кэше не оказалось; их
+    миниатюры находятся разом через ``thumbnails.resolve``. Карточки
+    с заглушкой вместо миниатюры в кэш не кладутся.
+    """
+    posts = list(posts)
+    post_tags = [cache_tags.for_post(post) for post in posts]
+    tag_versions = versions({tag for tags in post_tags for tag in tags})
+    keys = [
+        make_key(template_name, tags, tag_versions=tag_versions)
+        for tags in post_tags
+    ]
+    cards = cache.get_many(keys)
+    thumbnails.resolve([
+        post for key, post in zip(keys, posts) if key not in cards
+    ])
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            with fragment() as card:
+                cards[key] = render_to_string(template_name, {'post': post})
+            if card.cacheable:
+                missing[key] = cards[key]
+    if missing:
+        cache.set_many(missing)
+    return [mark_safe(cards[key]) for key in keys]
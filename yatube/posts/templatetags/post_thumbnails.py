@@ -0,0 +1,35 @@
+from django import template
+
+from core.cache import skip_caching
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, geometry):
+    """Варианты миниатюры (``thumbnails.Picture``) или None, пока их
+    строит воркер.
+
+        {% post_thumbnail post.image "960x339" as im %}
+
+    Миниатюры строятся в фоне после сохранения поста (и командой
+    ``pregenerate_thumbnails`` для старых постов), поэтому в запросе
+    их нет смысла генерировать: шаблон показывает заглушку, а фрагмент
+    с ней не попадает в кэш. Если страница уже нашла миниатюры через
+    ``thumbnails.resolve``, тег не обращается к хранилищу.
+    """
+    if not image:
+        return None
+    if geometry not in thumbnails.GEOMETRIES:
+        raise template.TemplateSyntaxError(
+            f'Геометрия {geometry} не описана в thumbnails.GEOMETRIES.'
+        )
+    resolved = getattr(image.instance, 'thumbnails', {})
+    if geometry in resolved:
+        thumbnail = resolved[geometry]
+    else:
+        thumbnail = thumbnails.cached(image, geometry)
+    if thumbnail is None:
+        skip_caching()
+    return thumbnail
@@ -1,14 +1,19 @@
+import io
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from posts.forms import PostForm
-from posts.models import Group, Post
+from posts.models import Comment, Group, Post
+from posts.storage import post_images
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -88,7 +93,9 @@ class PostFormsTest(TestCase):
             Post.objects.filter(
                 text='Тестовый текст',
                 group=self.group.pk,
-                image='posts/small1.gif',
+                image=post_images.hashed_name(
+                    'posts/small1.gif', ContentFile(small_gif)
+                ),
             ).exists()
         )
 
@@ -128,6 +135,26 @@ class PostFormsTest(TestCase):
             ).exists()
         )
 
+    def test_post_edit_keeps_concurrent_comment_count(self):
+        """Правка поста не затирает комментарий, добавленный во время неё."""
+        is_valid = PostForm.is_valid
+
+        def comment_then_validate(form):
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Успел'
+            )
+            return is_valid(form)
+
+        before = Post.objects.get(pk=self.post.pk).comment_count
+        with mock.patch.object(PostForm, 'is_valid', comment_then_validate):
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+                data={'text': 'Правка', 'group': self.group.pk},
+            )
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.comment_count, before + 1)
+
     def test_cant_change_existing_post(self):
         post_count = Post.objects.count()
         form_data = {
@@ -143,3 +170,64 @@ class PostFormsTest(TestCase):
         self.assertRedirects(response, '/auth/login/?next=/create/')
         self.assertEqual(Post.objects.count(), post_count)
         self.assertEqual(response.status_code, 200)
+
+    @staticmethod
+    def make_image(name, size, image_format):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format)
+        return SimpleUploadedFile(
+            name, buffer.getvalue(), f'image/{image_format.lower()}'
+        )
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10_000)
+    def test_too_many_pixels_rejected(self):
+        """Картинка больше лимита пикселей отклоняется по заголовку."""
+        form = PostForm(
+            data={'text': 'Большая картинка'},
+            files={'image': self.make_image('big.png', (200, 100), 'PNG')},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['image'][0].split()[0], 'Картинка')
+
+    def test_not_an_image_rejected(self):
+        """Файл не-картинка отклоняется."""
+        form = PostForm(
+            data={'text': 'Не картинка'},
+            files={'image': SimpleUploadedFile(
+                'fake.jpg', b'not an image', 'image/jpeg'
+            )},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_large_image_downscaled(self):
+        """Оригинал уменьшается до наибольшей стороны из настроек."""
+        cases = {
+            'wide.jpeg': ('JPEG', '.jpg'),
+            'wide.gif': ('GIF', '.png'),
+        }
+        for name, (image_format, stored) in cases.items():
+            with self.subTest(name=name):
+                self.authorized_client.post(reverse('posts:post_create'), {
+                    'text': f'Широкая {name}',
+                    'image': self.make_image(name, (400, 300), image_format),
+                })
+                post = Post.objects.get(text=f'Широкая {name}')
+                self.assertTrue(post.image.name.endswith(stored))
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.size, (100, 75))
+
+    @override_settings(POST_IMAGE_MAX_SIDE=1000)
+    def test_small_image_kept_as_is(self):
+        """Подходящая по размеру картинка сохраняется без перекодирования."""
+        uploaded = self.make_image('fits.jpg', (400, 300), 'JPEG')
+        content = uploaded.read()
+        uploaded.seek(0)
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Подходящая',
+            'image': uploaded,
+        })
+        post = Post.objects.get(text='Подходящая')
+        with open(post.image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
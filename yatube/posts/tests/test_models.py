@@ -1,9 +1,29 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
 
-from ..models import Group, Post
+from search.index import search_posts
+from search.models import Suggestion
+from .. import counters, media, seed, user_stats
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, UserStats
+)
+from ..storage import post_images
 
 User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class PostModelTest(TestCase):
@@ -53,3 +73,408 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+class PostCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.create(author=cls.author, text='Первый')
+
+    def counts(self):
+        scopes = {
+            counters.ALL: Post.objects.all(),
+            counters.author_scope(self.author.pk): self.author.posts.all(),
+            counters.group_scope(self.group.pk): self.group.posts.all(),
+            counters.feed_scope(self.reader.pk): Post.objects.filter(
+                author__following__user=self.reader
+            ),
+        }
+        return [
+            counters.get(scope, queryset)
+            for scope, queryset in scopes.items()
+        ]
+
+    def test_counters_follow_posts(self):
+        """Счётчики следуют за созданием, правкой и удалением постов."""
+        self.assertEqual(self.counts(), [1, 1, 0, 1])
+        post = Post.objects.create(
+            author=self.author, text='Второй', group=self.group
+        )
+        self.assertEqual(self.counts(), [2, 2, 1, 2])
+        post.group = None
+        post.save()
+        self.assertEqual(self.counts(), [2, 2, 0, 2])
+        post.delete()
+        self.assertEqual(self.counts(), [1, 1, 0, 1])
+        Follow.objects.all().delete()
+        self.assertEqual(self.counts(), [1, 1, 0, 0])
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def stats(self, user):
+        return UserStats.objects.values_list(
+            'posts_count', 'comments_count',
+            'followers_count', 'following_count'
+        ).get(user=user)
+
+    def test_stats_follow_activity(self):
+        """Статистика обновляется сигналами после первого чтения."""
+        user_stats.get(self.author)
+        user_stats.get(self.reader)
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author), (1, 0, 1, 0))
+        self.assertEqual(self.stats(self.reader), (0, 1, 0, 1))
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.stats(self.author), (0, 0, 0, 0))
+        self.assertEqual(self.stats(self.reader), (0, 0, 0, 0))
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает статистику с нуля."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.author, text='Да')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.stats(self.author), (1, 1, 1, 0))
+        self.assertEqual(self.stats(self.reader), (0, 0, 0, 1))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTest(TestCase):
+    gif = (
+        b'\x47\x49\x46\x38\x39\x61\x01\x00'
+        b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+        b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+        b'\x00\x00\x01\x00\x01\x00\x00\x02'
+        b'\x02\x4c\x01\x00\x3b'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text=name,
+            image=SimpleUploadedFile(name, self.gif, 'image/gif'),
+        )
+
+    def test_same_bytes_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом по хешу."""
+        first = self.create_post('cat.gif')
+        second = self.create_post('Cat_copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(post_images.is_hashed(first.image.name))
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+
+    def test_file_removed_with_last_reference(self):
+        """Файл удаляется только вместе с последним ссылающимся постом."""
+        first = self.create_post('one.gif')
+        second = self.create_post('two.gif')
+        name = first.image.name
+        os.utime(post_images.path(name), (0, 0))
+        with mock.patch.object(
+            media.transaction, 'on_commit', lambda callback: callback()
+        ):
+            first.delete()
+            self.assertTrue(post_images.exists(name))
+            second.delete()
+        self.assertFalse(post_images.exists(name))
+
+    def test_reused_file_is_not_released(self):
+        """Только что переиспользованный файл не удаляется сразу."""
+        first = self.create_post('one.gif')
+        name = first.image.name
+        os.utime(post_images.path(name), (0, 0))
+        post_images.save('posts/again.gif', ContentFile(self.gif))
+        with mock.patch.object(
+            media.transaction, 'on_commit', lambda callback: callback()
+        ):
+            first.delete()
+        self.assertTrue(post_images.exists(name))
+
+    def test_concurrent_save_of_same_bytes(self):
+        """Файл, появившийся во время записи, не зацикливает сохранение."""
+        name = self.create_post('one.gif').image.name
+        with mock.patch.object(os, 'utime', side_effect=FileNotFoundError):
+            again = post_images.save('posts/two.gif', ContentFile(self.gif))
+        self.assertEqual(again, name)
+        self.assertEqual(
+            os.listdir(os.path.dirname(post_images.path(name))),
+            [os.path.basename(name)]
+        )
+
+    def test_dedupe_command_merges_old_files(self):
+        """Команда переносит старые имена под хеш и удаляет дубликаты."""
+        names = []
+        for name in ('posts/old.gif', 'posts/old_copy.gif'):
+            names.append(FileSystemStorage().save(name, ContentFile(self.gif)))
+        posts = [
+            Post.objects.create(author=self.user, text=name, image=name)
+            for name in names
+        ]
+        call_command('dedupe_post_images', stdout=StringIO())
+        hashed = {
+            Post.objects.get(pk=post.pk).image.name for post in posts
+        }
+        self.assertEqual(len(hashed), 1)
+        self.assertTrue(post_images.is_hashed(hashed.pop()))
+        for name in names:
+            self.assertFalse(post_images.exists(name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.kept = post_images.save(
+            'posts/kept.gif', ContentFile(ContentAddressedMediaTest.gif)
+        )
+        Post.objects.create(author=self.user, text='Пост', image=self.kept)
+        self.orphan = post_images.save(
+            'posts/orphan.gif', ContentFile(b'GIF89a orphan')
+        )
+        self.thumbnail = FileSystemStorage().save(
+            'cache/00/00/stale.jpg', ContentFile(b'stale')
+        )
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        for name in (self.kept, self.orphan, self.thumbnail):
+            os.utime(post_images.path(name), (0, 0))
+
+    def collect(self, *args):
+        output = StringIO()
+        call_command('collect_media_garbage', *args, stdout=output)
+        return output.getvalue()
+
+    def test_dry_run_only_reports(self):
+        """Пробный запуск находит сирот, но ничего не удаляет."""
+        output = self.collect('--dry-run')
+        self.assertIn('Найдено (originals): 1', output)
+        self.assertIn('Найдено (thumbnails): 1', output)
+        self.assertTrue(post_images.exists(self.orphan))
+        self.assertTrue(post_images.exists(self.thumbnail))
+
+    def test_orphans_deleted_references_kept(self):
+        """Удаляются только файлы без ссылающихся постов."""
+        self.collect()
+        self.assertTrue(post_images.exists(self.kept))
+        self.assertFalse(post_images.exists(self.orphan))
+        self.assertFalse(post_images.exists(self.thumbnail))
+
+    def test_fresh_files_are_skipped(self):
+        """Свежие файлы могут ещё дописываться и не трогаются."""
+        os.utime(post_images.path(self.orphan))
+        self.collect()
+        self.assertTrue(post_images.exists(self.orphan))
+
+    def test_resumes_from_state_file(self):
+        """Прерванный запуск продолжается после сохранённой позиции."""
+        state_file = os.path.join(TEMP_MEDIA_ROOT, 'gc.json')
+        with open(state_file, 'w') as state:
+            json.dump({'originals': 'posts/ff'}, state)
+        self.collect('--state-file', state_file)
+        self.assertTrue(post_images.exists(self.orphan))
+        self.assertFalse(post_images.exists(self.thumbnail))
+        self.assertFalse(os.path.exists(state_file))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportContentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+
+    def run_import(self, name, lines, *args):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        output, errors = StringIO(), StringIO()
+        call_command(
+            'import_content', path, '--chunk-size', '2',
+            '--media-dir', self.directory, *args,
+            stdout=output, stderr=errors,
+        )
+        return output.getvalue(), errors.getvalue()
+
+    def test_import_updates_derived_data(self):
+        """Импорт пачками обновляет всё, что обычно делают сигналы."""
+        records = [
+            {'type': 'group', 'slug': 'cats', 'title': 'Кошки',
+             'description': 'Про кошек'},
+            {'type': 'post', 'id': 500, 'author': 'author', 'group': 'cats',
+             'text': 'Кошки спят', 'pub_date': '2015-03-01T10:00:00'},
+            {'type': 'post', 'author': 'author', 'text': 'Второй пост'},
+            {'type': 'post', 'author': 'nobody', 'text': 'Чужой пост'},
+            {'type': 'comment', 'post': 500, 'author': 'reader',
+             'text': 'Мяу', 'created': '2015-03-02T10:00:00'},
+            {'type': 'follow', 'user': 'author', 'author': 'reader'},
+        ]
+        counters.get(counters.ALL, Post.objects.all())
+        output, errors = self.run_import(
+            'content.jsonl', [json.dumps(record) for record in records]
+        )
+        self.assertIn('Запись 4: author: неизвестный пользователь', errors)
+        self.assertIn('post: 2', output)
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.group.slug, 'cats')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.comments.get().created.day, 2)
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=self.author, author=self.reader
+        ).exists())
+        stats = user_stats.get(User.objects.get(pk=self.author.pk))
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count,
+             stats.following_count),
+            (2, 1, 1)
+        )
+        self.assertEqual(counters.get(counters.ALL, Post.objects.all()), 2)
+        self.assertEqual(list(search_posts('кошка')), [post])
+        created = Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(created.pk, 500)
+
+    def test_csv_with_type_and_image(self):
+        """CSV одного типа; картинка проходит проверки формы."""
+        with open(os.path.join(self.directory, 'cat.gif'), 'wb') as file:
+            file.write(ContentAddressedMediaTest.gif)
+        self.run_import('posts.csv', [
+            'author,text,image',
+            'author,С картинкой,cat.gif',
+            'author,,',
+        ], '--type', 'post')
+        post = Post.objects.get()
+        self.assertTrue(post_images.is_hashed(post.image.name))
+        self.assertTrue(post_images.exists(post.image.name))
+
+    def test_resumes_after_committed_chunks(self):
+        """С файлом состояния уже записанные пачки пропускаются."""
+        state_file = os.path.join(self.directory, 'state.json')
+        with open(state_file, 'w') as state:
+            json.dump({'done': 2}, state)
+        self.run_import('posts.jsonl', [
+            json.dumps({'type': 'post', 'author': 'author', 'text': text})
+            for text in ('Первый', 'Второй', 'Третий')
+        ], '--state-file', state_file)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Третий']
+        )
+        self.assertFalse(os.path.exists(state_file))
+
+    def test_export_round_trip(self):
+        """Выгрузка export_content загружается обратно без потерь."""
+        self.run_import('posts.jsonl', [
+            json.dumps({'type': 'post', 'id': 7, 'author': 'author',
+                        'text': 'Пост', 'pub_date': '2015-03-01T10:00:00'}),
+            json.dumps({'type': 'comment', 'post': 7, 'author': 'author',
+                        'text': 'Ответ'}),
+        ])
+        path = os.path.join(self.directory, 'export.csv')
+        call_command(
+            'export_content', 'author', '--format', 'csv', '--output', path
+        )
+        expected = list(Post.objects.values_list('pk', 'text', 'pub_date'))
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        call_command('import_content', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list('pk', 'text', 'pub_date')),
+            expected
+        )
+        self.assertEqual(Comment.objects.get().text, 'Ответ')
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedScaleTest(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+
+    def test_records_are_deterministic(self):
+        """Один seed — одни и те же записи, другой seed — другие."""
+        def records(value):
+            return list(seed.Seed(
+                seed=value, users=10, posts=20, comments=30, follows=15
+            ).records(1, ['a.jpg']))
+
+        self.assertEqual(records(1), records(1))
+        self.assertNotEqual(records(1), records(2))
+        self.assertEqual(
+            [record['type'] for record in records(1)].count('comment'), 30
+        )
+
+    def test_seed_scale_fills_database(self):
+        """seed_scale пишет данные вместе с лентами, поиском и подсказками."""
+        call_command(
+            'seed_scale', '--users', '20', '--groups', '3', '--posts', '50',
+            '--comments', '60', '--follows', '40', '--images', '2',
+            '--image-ratio', '0.5', stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(
+            username__startswith='seed', password__startswith='!'
+        ).count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 60)
+        self.assertEqual(
+            sum(Post.objects.values_list('comment_count', flat=True)), 60
+        )
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count()
+        )
+        self.assertEqual(
+            Suggestion.objects.filter(kind=Suggestion.USER).count(), 20
+        )
+        images = set(
+            Post.objects.exclude(image='').values_list('image', flat=True)
+        )
+        self.assertTrue(0 < len(images) <= 2)
+        for name in images:
+            self.assertTrue(post_images.exists(name))
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', '--users', '5', stdout=StringIO())
@@ -1,17 +1,29 @@
+import base64
+import json
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock, skipUnless
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from PIL import features
 
+from core.middleware import QueryBudgetExceeded, fingerprint
+from posts import counters, exporter, recent_posts, thumbnails
 from posts.forms import PostForm
-from posts.models import Comment, Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.paginator import ELLIPSIS, CountedPaginator
+from posts.templatetags.post_cards import post_cards
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -297,6 +309,100 @@ class PaginatorViewsTest(TestCase):
                     'page_obj'
                 ).object_list), 3)
 
+    def test_cursor_pages(self):
+        """Курсоры ведут на соседние страницы без номера страницы."""
+        templates = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'An'})
+        )
+        for url in templates:
+            with self.subTest(url=url):
+                cache.clear()
+                first = self.client.get(url).context['page_obj']
+                self.assertIsNone(first.previous_cursor)
+                second = self.client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second.object_list), 3)
+                self.assertIsNone(second.next_cursor)
+                back = self.client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(back.object_list, first.object_list)
+
+    def test_page_links_are_elided(self):
+        """Ссылок на страницы немного, даже когда страниц много."""
+        paginator = CountedPaginator(Post.objects.all(), 1, counters.ALL)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(7)),
+            [1, ELLIPSIS, 5, 6, 7, 8, 9, ELLIPSIS, 13]
+        )
+        response = self.client.get(
+            reverse('posts:index'), {'page': 2}
+        )
+        self.assertEqual(
+            [number for number, _ in response.context['page_obj'].page_links],
+            [1, 2]
+        )
+
+    def test_last_page_cursor_matches_page_number(self):
+        """Последняя страница по курсору та же, что по номеру."""
+        paginator = CountedPaginator(Post.objects.all(), 5, counters.ALL)
+        page = paginator.get_cursor_page(paginator.last_cursor)
+        for number in (3, 2, 1):
+            with self.subTest(number=number):
+                self.assertEqual(page.number, number)
+                self.assertEqual(
+                    page.object_list,
+                    list(paginator.page(number).object_list)
+                )
+                if number > 1:
+                    page = paginator.get_cursor_page(page.previous_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+    def test_feed_query_count_is_constant(self):
+        """Страница ленты стоит одинаково при 10 и при 3 постах."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        first = self.client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(url, {'cursor': first.next_cursor})
+        self.assertEqual(len(full), len(short))
+        # Запрос группы для ETag, группа, счётчик и страница постов.
+        self.assertLessEqual(len(full), 4)
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'An'}),
+            {'cursor': 'garbage'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj'].object_list), 10
+        )
+
+    def test_cursor_with_bad_page_number(self):
+        """Номер страницы не целым числом делает курсор испорченным."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'An'}),
+            reverse('api:index'),
+        )
+        for number in ('2', 2.5, True, [2]):
+            data = json.dumps(
+                ['n', ['2030-01-01T00:00:00+00:00', '9999'], number]
+            )
+            cursor = base64.urlsafe_b64encode(data.encode()).decode()
+            for url in urls:
+                with self.subTest(number=number, url=url):
+                    cache.clear()
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+        paginator = CountedPaginator(Post.objects.all(), 10, counters.ALL)
+        self.assertIsNone(paginator.decode_cursor(cursor))
+
 
 class CommentViewsTest(TestCase):
     @classmethod
@@ -376,27 +482,58 @@ class CommentViewsTest(TestCase):
             ).exists()
         )
 
+    def test_comments_are_paginated(self):
+        """Комментарии выводятся страницами, остальные — фрагментом."""
+        for i in range(25):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f'Комментарий {i}'
+            )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 25)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments.object_list), 20)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': comments.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {i}' for i in range(20, 25)]
+        )
+
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
+        """Главная кэшируется до изменения показанных на ней данных."""
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='test_new_post',
-            author=self.user,
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='changed_quietly')
         response_old = self.authorized_client.get(
             reverse('posts:index')
         )
-        old_posts = response_old.content
         self.assertEqual(
-            old_posts,
+            response_old.content,
             posts,
             'Не возвращает кэшированную страницу.'
         )
-        cache.clear()
+        Post.objects.create(
+            text='test_new_post',
+            author=self.user,
+        )
         response_new = self.authorized_client.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts, 'Нет сброса кэша.')
+        self.assertNotEqual(
+            response_new.content, posts, 'Новый пост не сбросил кэш.'
+        )
+        self.assertContains(response_new, 'test_new_post')
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response_renamed = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertContains(response_renamed, 'Переименованный')
 
 
 class FollowViewsTest(TestCase):
@@ -423,6 +560,9 @@ class FollowViewsTest(TestCase):
             author=cls.user
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_follow(self):
         """Тест работы подписки на автора."""
         self.authorized_other_user.get(
@@ -546,3 +686,438 @@ class FollowViewsTest(TestCase):
             new_posts,
             'Новый пост не должен появляться'
         )
+
+    def test_timeline_follows_subscription(self):
+        """Лента подписчика заполняется при подписке и чистится при отписке."""
+        follow_url = reverse(
+            'posts:profile_follow', kwargs={'username': self.user.username}
+        )
+        unfollow_url = reverse(
+            'posts:profile_unfollow', kwargs={'username': self.user.username}
+        )
+        timeline = TimelineEntry.objects.filter(user=self.other_user)
+        self.authorized_other_user.get(follow_url)
+        self.assertEqual(list(timeline.values_list('post', flat=True)), [
+            self.post.pk
+        ])
+        new_post = Post.objects.create(text='new', author=self.user)
+        self.assertTrue(timeline.filter(post=new_post).exists())
+        self.authorized_other_user.get(unfollow_url)
+        self.assertFalse(timeline.exists())
+
+    def test_follow_feed_cache_is_invalidated(self):
+        """Кэш ленты подписок сбрасывается новым постом и отпиской."""
+        Follow.objects.create(user=self.other_user, author=self.user)
+        url = reverse('posts:follow_index')
+        cache.clear()
+        with CaptureQueriesContext(connection) as cold:
+            first = self.authorized_other_user.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as warm:
+            repeat = self.authorized_other_user.get(url).context['page_obj']
+        self.assertEqual(repeat.object_list, first.object_list)
+        self.assertLess(len(warm), len(cold))
+        new_post = Post.objects.create(text='fresh', author=self.user)
+        response = self.authorized_other_user.get(url)
+        self.assertIn(new_post, response.context['page_obj'].object_list)
+        Follow.objects.filter(user=self.other_user).delete()
+        response = self.authorized_other_user.get(url)
+        self.assertEqual(len(response.context['page_obj'].object_list), 0)
+
+
+class FollowFeedEnginesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(25):
+            Post.objects.create(text=f'Пост {i}', author=cls.authors[i % 3])
+        Post.objects.create(text='Чужой пост', author=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def walk(self):
+        pages, params = [], {}
+        while True:
+            page_obj = self.client.get(
+                reverse('posts:follow_index'), params
+            ).context['page_obj']
+            pages.append([post.pk for post in page_obj.object_list])
+            if page_obj.next_cursor is None:
+                return pages
+            params = {'cursor': page_obj.next_cursor}
+
+    def test_engines_return_same_feed(self):
+        """Все движки ленты подписок отдают одинаковые страницы."""
+        with self.settings(FOLLOW_FEED_ENGINE='join'):
+            expected = self.walk()
+        self.assertEqual(sum(map(len, expected)), 25)
+        for engine, limit in (('timeline', 200), ('merge', 200),
+                              ('merge', 4)):
+            with self.subTest(engine=engine, limit=limit):
+                cache.clear()
+                with self.settings(FOLLOW_FEED_ENGINE=engine,
+                                   FOLLOW_FEED_RECENT_POSTS=limit):
+                    self.assertEqual(self.walk(), expected)
+
+    def test_timelines_only_written_for_timeline_engine(self):
+        """Другие движки не пишут ленты; команда строит их заново."""
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        expected = set(entries.values_list('post', flat=True))
+        with self.settings(FOLLOW_FEED_ENGINE='merge'):
+            call_command('rebuild_timelines', stdout=StringIO())
+            self.assertFalse(TimelineEntry.objects.exists())
+            post = Post.objects.create(text='Новый', author=self.authors[0])
+            Follow.objects.create(user=self.authors[1], author=self.reader)
+            self.assertFalse(TimelineEntry.objects.exists())
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            set(entries.values_list('post', flat=True)), expected | {post.pk}
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.authors[1]).exists()
+        )
+
+    def test_recent_posts_load_in_one_query(self):
+        """Списки авторов без кэша читаются одним запросом."""
+        author_ids = [author.pk for author in self.authors]
+        with self.settings(FOLLOW_FEED_RECENT_POSTS=4):
+            with self.assertNumQueries(1):
+                lists = recent_posts.get_many(author_ids)
+            with self.assertNumQueries(0):
+                self.assertEqual(recent_posts.get_many(author_ids), lists)
+        for author_id in author_ids:
+            self.assertEqual(lists[author_id], list(
+                Post.objects.filter(author_id=author_id).values_list(
+                    'pub_date', 'pk'
+                )[:4]
+            ))
+
+
+class QueryInspectorTest(TestCase):
+    def test_fingerprint_collapses_in_lists(self):
+        """Запросы с разной длиной IN считаются одной формой."""
+        self.assertEqual(
+            fingerprint('SELECT * FROM t\n WHERE id IN (%s, %s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+        )
+
+    def test_budget_fails_request(self):
+        """Превышение бюджета запросов роняет тест."""
+        options = {
+            'ENABLED': True,
+            'BUDGETS': {'posts:index': 0},
+            'RAISE': True,
+        }
+        with self.settings(QUERY_INSPECTOR=options):
+            with self.assertRaises(QueryBudgetExceeded):
+                Client().get(reverse('posts:index'))
+            response = Client().get(reverse('about:author'))
+        self.assertEqual(response['X-Query-Count'], '0')
+        self.assertEqual(response['X-Query-Repeats'], '0')
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Старый текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cards_are_cached_until_post_changes(self):
+        """Карточка берётся из кэша, пока не изменится пост или группа."""
+        self.assertIn('Старый текст', post_cards([self.post])[0])
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn('Старый текст', post_cards([post])[0])
+        post.save()
+        self.assertIn('Тихая правка', post_cards([post])[0])
+        self.group.slug = 'renamed'
+        self.group.save()
+        post = Post.objects.select_related('group').get(pk=self.post.pk)
+        self.assertIn('/group/renamed/', post_cards([post])[0])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменная страница отдаёт 304 без повторной отрисовки."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'group'}),
+            reverse('posts:profile', kwargs={'username': 'An'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+
+    def test_etag_changes_with_content_and_user(self):
+        """ETag меняется после правки поста и для другого пользователя."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        self.post.text = 'Новый текст'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        etag = response['ETag']
+        self.client.force_login(self.reader)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_changes_profile_etag(self):
+        """Подписка меняет ETag профиля автора."""
+        self.client.force_login(self.reader)
+        url = reverse('posts:profile', kwargs={'username': 'An'})
+        etag = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_group_change_changes_profile_etag(self):
+        """Переименование и удаление группы меняют ETag профиля."""
+        url = reverse('posts:profile', kwargs={'username': 'An'})
+        etag = self.client.get(url)['ETag']
+        self.group.slug = 'renamed'
+        self.group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, '/group/renamed/')
+        etag = response['ETag']
+        self.group.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, '/group/renamed/')
+
+    def test_missing_page_is_not_found(self):
+        """Для несуществующей страницы условный GET не мешает 404."""
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'Nobody'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x02\x00'
+        b'\x01\x00\x80\x00\x00\x00\x00\x00'
+        b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+        b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+        b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+        b'\x0A\x00\x3B'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=cls.small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """Без миниатюры — заглушка без кэша и ETag, затем картинка."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'aspect-ratio')
+        self.assertFalse(response.has_header('ETag'))
+        index = self.client.get(reverse('posts:index'))
+        self.assertContains(index, 'aspect-ratio')
+        thumbnails.generate(self.post.image.name, self.post.pk)
+        for page in (url, reverse('posts:index')):
+            with self.subTest(page=page):
+                response = self.client.get(page)
+                self.assertNotContains(response, 'aspect-ratio')
+                self.assertContains(response, '<img class="card-img my-2"')
+                self.assertTrue(response.has_header('ETag'))
+
+    def test_create_enqueues_thumbnails(self):
+        """Новый пост с картинкой получает миниатюры после коммита."""
+        self.client.force_login(self.user)
+        with mock.patch.object(
+            thumbnails.transaction, 'on_commit', lambda callback: callback()
+        ):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile(
+                    name='new.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            })
+        post = Post.objects.get(text='Новый пост')
+        self.assertFalse(thumbnails.missing(post.image))
+
+    def test_page_resolves_thumbnails_in_one_query(self):
+        """Миниатюры карточек страницы читаются одним запросом к БД."""
+        posts = [self.post]
+        for number in range(2):
+            posts.append(Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост {number}',
+                image=SimpleUploadedFile(
+                    name=f'more{number}.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            ))
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            cards = post_cards(posts)
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for card in cards:
+            self.assertIn('<img class="card-img my-2"', card)
+
+    def test_variants_in_all_widths(self):
+        """Миниатюра отдаётся в нескольких ширинах через srcset."""
+        thumbnails.generate(self.post.image.name)
+        picture = thumbnails.cached(self.post.image, '960x339')
+        self.assertEqual(
+            sorted(picture.files),
+            [(image_format, width)
+             for image_format in sorted(thumbnails.FORMATS)
+             for width in thumbnails.WIDTHS]
+        )
+        self.assertEqual(picture.files[('JPEG', 480)].x, 480)
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, ' 480w, ')
+
+    @skipUnless(features.check('webp'), 'Pillow собран без WebP')
+    def test_webp_variants(self):
+        """Браузеры с WebP получают его через <source>."""
+        thumbnails.generate(self.post.image.name)
+        picture = thumbnails.cached(self.post.image, '960x339')
+        self.assertTrue(picture.files[('WEBP', 480)].url.endswith('.webp'))
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, '<source type="image/webp"')
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.other = User.objects.create_user(username='Bo')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        for number in range(5):
+            Post.objects.create(
+                author=cls.user, text=f'Пост {number}', group=cls.group
+            )
+        cls.post = Post.objects.latest('pk')
+        Comment.objects.create(post=cls.post, author=cls.user, text='Да')
+        Follow.objects.create(user=cls.user, author=cls.other)
+        Follow.objects.create(user=cls.other, author=cls.user)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(
+            reverse('posts:profile_export', args=['An']), params
+        )
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_jsonl(self):
+        """Владелец получает все свои записи построчно в JSONL."""
+        response, content = self.export()
+        self.assertEqual(
+            response['Content-Disposition'], 'attachment; filename="An.jsonl"'
+        )
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [row['type'] for row in rows],
+            ['post'] * 5 + ['comment'] + ['follow'] * 2
+        )
+        self.assertEqual(rows[0]['id'], self.post.pk)
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[5]['post'], self.post.pk)
+
+    def test_csv(self):
+        """CSV начинается с заголовка общих колонок."""
+        response, content = self.export(format='csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        lines = content.splitlines()
+        self.assertTrue(lines[0].startswith('type,id,user,author,post'))
+        self.assertEqual(len(lines), 1 + 5 + 1 + 2)
+
+    def test_only_owner_and_staff(self):
+        """Чужую выгрузку получить нельзя, гостя просят войти."""
+        self.client.force_login(self.other)
+        response = self.client.get(
+            reverse('posts:profile_export', args=['An'])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.client.logout()
+        response = self.client.get(
+            reverse('posts:profile_export', args=['An'])
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_keyset_batches(self):
+        """Пачки по ключу отдают все строки по одному разу."""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(exporter.records(self.user, batch_size=2))
+        self.assertEqual(
+            [row['id'] for row in rows if row['type'] == 'post'],
+            list(Post.objects.filter(author=self.user).values_list(
+                'pk', flat=True
+            ))
+        )
+        self.assertFalse(
+            any('OFFSET' in query['sql'] for query in queries)
+        )
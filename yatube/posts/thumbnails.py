@@ -0,0 +1,240 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from PIL import features
+from django.conf import settings
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDbKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import cache
+from . import cache_tags
+from .storage import post_images
+
+logger = logging.getLogger(__name__)
+
+# Миниатюры, которые используют шаблоны: самая широкая геометрия и
+# опции sorl. Для каждой строятся варианты всех ширин из WIDTHS (не шире
+# исходной) во всех форматах из FORMATS; последний формат — запасной
+# для браузеров, которые не знают остальных. WebP строится, только
+# если Pillow собран с libwebp.
+GEOMETRIES = {
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+WIDTHS = (480, 720, 960)
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Picture:
+    """Варианты миниатюры для ``<picture>`` с ``srcset`` по форматам."""
+
+    def __init__(self, geometry, files):
+        self.width, self.height = map(int, geometry.split('x'))
+        self.sizes = f'(max-width: {self.width}px) 100vw, {self.width}px'
+        self.files = files
+
+    def srcset(self, image_format):
+        return ', '.join(
+            f'{thumbnail.url} {width}w'
+            for (file_format, width), thumbnail in self.files.items()
+            if file_format == image_format
+        )
+
+    @property
+    def sources(self):
+        """Пары ``(MIME-тип, srcset)`` для ``<source>``."""
+        return [
+            (MIME_TYPES[image_format], self.srcset(image_format))
+            for image_format in FORMATS[:-1]
+        ]
+
+    @property
+    def fallback_srcset(self):
+        return self.srcset(FORMATS[-1])
+
+    @property
+    def url(self):
+        return self.files[(FORMATS[-1], self.width)].url
+
+
+def variants(geometry):
+    """Тройки ``(формат, ширина, геометрия)`` вариантов миниатюры."""
+    width, height = map(int, geometry.split('x'))
+    for image_format in FORMATS:
+        for variant_width in WIDTHS:
+            if variant_width <= width:
+                variant_height = round(height * variant_width / width)
+                yield (
+                    image_format,
+                    variant_width,
+                    f'{variant_width}x{variant_height}',
+                )
+
+
+def _options(source, geometry, image_format):
+    """Опции, с которыми ``get_thumbnail`` строит имя миниатюры."""
+    options = {**GEOMETRIES[geometry], 'format': image_format}
+    backend = default.backend
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, name in backend.extra_options:
+        value = getattr(sorl_settings, name)
+        if value != getattr(sorl_defaults, name):
+            options.setdefault(key, value)
+    return options
+
+
+def _variant_keys(image, geometry):
+    """Ключи хранилища sorl для вариантов; без обращения к хранилищу."""
+    source = ImageFile(image)
+    keys = {}
+    for image_format, width, variant in variants(geometry):
+        name = default.backend._get_thumbnail_filename(
+            source, variant, _options(source, geometry, image_format)
+        )
+        keys[(image_format, width)] = add_prefix(
+            ImageFile(name, default.storage).key
+        )
+    return keys
+
+
+def _picture(geometry, keys, values):
+    """Собрать Picture, если готовы все варианты, иначе None."""
+    files = {}
+    for variant, key in keys.items():
+        if not values.get(key):
+            return None
+        files[variant] = deserialize_image_file(values[key])
+    return Picture(geometry, files)
+
+
+def cached(image, geometry):
+    """Готовые варианты миниатюры или None; без генерации."""
+    keys = _variant_keys(image, geometry)
+    return _picture(geometry, keys, _get_many(list(keys.values())))
+
+
+def _get_many(keys):
+    """Сырые значения хранилища sorl: один ``get_many`` и один запрос.
+
+    Хранилища без кэша поверх БД читаются по одному ключу.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = {
+        key: value
+        for key, value in kvstore.cache.get_many(keys).items()
+        if value != EMPTY_VALUE
+    }
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        if found:
+            kvstore.cache.set_many(
+                found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+        values.update(found)
+    return values
+
+
+def resolve(posts):
+    """Найти миниатюры всех постов страницы разом.
+
+    Результат кладётся в ``post.thumbnails`` — словарь геометрия →
+    Picture или None, — и ``{% post_thumbnail %}`` берёт его оттуда,
+    не обращаясь к хранилищу.
+    """
+    keys = {}
+    for post in posts:
+        post.thumbnails = {}
+        if post.image:
+            for geometry in GEOMETRIES:
+                keys[(post.pk, geometry)] = _variant_keys(
+                    post.image, geometry
+                )
+    values = _get_many([
+        key for variant_keys in keys.values()
+        for key in variant_keys.values()
+    ])
+    for post in posts:
+        if post.image:
+            for geometry in GEOMETRIES:
+                post.thumbnails[geometry] = _picture(
+                    geometry, keys[(post.pk, geometry)], values
+                )
+
+
+def generate(image_name, post_id=None):
+    """Построить все варианты миниатюр; выполняется в воркере."""
+    source = ImageFile(image_name, post_images)
+    for geometry, options in GEOMETRIES.items():
+        for image_format, _, variant in variants(geometry):
+            get_thumbnail(source, variant, **options, format=image_format)
+    if post_id is not None:
+        cache.bump(cache_tags.post(post_id))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def _done(image_name, future):
+    with _lock:
+        _pending.discard(image_name)
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось построить миниатюры %s', image_name,
+            exc_info=future.exception()
+        )
+
+
+def submit(image_name, post_id=None):
+    """Поставить изображение в очередь, если оно ещё не в ней."""
+    if not settings.THUMBNAIL_WORKERS:
+        generate(image_name, post_id)
+        return
+    with _lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    future = _get_executor().submit(generate, image_name, post_id)
+    future.add_done_callback(lambda future: _done(image_name, future))
+
+
+def enqueue(post):
+    """Построить миниатюры поста в фоне после коммита транзакции."""
+    if post.image:
+        image_name, post_id = post.image.name, post.pk
+        transaction.on_commit(lambda: submit(image_name, post_id))
+
+
+def missing(image):
+    """Есть ли у изображения геометрии без готовой миниатюры."""
+    return any(cached(image, geometry) is None for geometry in GEOMETRIES)
@@ -0,0 +1,134 @@
+from collections import defaultdict
+
+from django.conf import settings
+
+from core.db import bulk_batch_size
+from . import counters, feeds
+from .models import Follow, Post, TimelineEntry
+from .paginator import paginate
+
+BATCH_SIZE = 1000
+
+
+def enabled():
+    """Ленты пишутся только для движка ``timeline``: остальным они не нужны."""
+    return settings.FOLLOW_FEED_ENGINE == 'timeline'
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=bulk_batch_size(TimelineEntry, BATCH_SIZE),
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """Разложить новый пост по лентам всех подписчиков автора."""
+    if not enabled():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out_many(posts):
+    """Разложить пачку новых постов по лентам подписчиков их авторов.
+
+    Возвращает идентификаторы подписчиков, чьи ленты изменились.
+    """
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(post)
+    followers = Follow.objects.filter(
+        author_id__in=list(by_author)
+    ).values_list('author_id', 'user_id')
+    users, entries, write = set(), [], enabled()
+    for author_id, user_id in followers.iterator():
+        users.add(user_id)
+        if not write:
+            continue
+        entries.extend(
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=author_id,
+                pub_date=post.pub_date,
+            )
+            for post in by_author[author_id]
+        )
+    _bulk_insert(entries)
+    return users
+
+
+def backfill(user_id, author_id):
+    """Добавить в ленту подписчика все посты автора."""
+    if enabled():
+        _backfill(user_id, author_id)
+
+
+def _backfill(user_id, author_id):
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убрать посты автора из ленты бывшего подписчика."""
+    if not enabled():
+        return
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Построить ленты заново по подпискам.
+
+    Нужна после переключения ``FOLLOW_FEED_ENGINE`` на ``timeline``:
+    пока работал другой движок, ленты не обновлялись. При другом
+    движке таблица только очищается. Возвращает число подписок.
+    """
+    TimelineEntry.objects.all().delete()
+    if not enabled():
+        return 0
+    follows = Follow.objects.order_by('pk').values_list(
+        'pk', 'user_id', 'author_id'
+    )
+    last_pk, rebuilt = 0, 0
+    while True:
+        batch = list(follows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return rebuilt
+        for _, user_id, author_id in batch:
+            _backfill(user_id, author_id)
+        last_pk = batch[-1][0]
+        rebuilt += len(batch)
+
+
+def get_page(request, per_page):
+    """Страница ленты подписок, прочитанная одним диапазоном индекса."""
+    entries = feeds.timeline_entries(request.user)
+    page_obj = paginate(
+        request, entries, per_page,
+        scope=counters.feed_scope(request.user.pk),
+        ordering=('-pub_date', '-post_id'),
+    )
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
+    return page_obj
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE = 1000
+
+SOURCES = {
+    'posts_count': (Post, 'author'),
+    'comments_count': (Comment, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def bump(changes, delta):
+    """Сдвинуть поля ``(user_id, поле)`` одной транзакцией.
+
+    Отсутствующие строки не создаются: их досчитает ``get``.
+    """
+    with transaction.atomic():
+        for user_id, field in changes:
+            UserStats.objects.filter(user_id=user_id).update(
+                **{field: F(field) + delta}
+            )
+
+
+def _counted(users):
+    counts = {}
+    for field, (model, lookup) in SOURCES.items():
+        subquery = model.objects.filter(
+            **{lookup: OuterRef('pk')}
+        ).order_by().values(lookup).annotate(total=Count('pk'))
+        counts[field] = Coalesce(
+            Subquery(subquery.values('total'), output_field=IntegerField()),
+            0
+        )
+    return users.annotate(**counts).values_list('pk', *SOURCES)
+
+
+def rebuild(users=None, batch_size=BATCH_SIZE):
+    """Пересчитать статистику с нуля пачками по ``batch_size``."""
+    users = (User.objects.all() if users is None else users).order_by('pk')
+    last_pk, rebuilt = None, 0
+    while True:
+        batch = users if last_pk is None else users.filter(pk__gt=last_pk)
+        rows = list(_counted(batch)[:batch_size])
+        if not rows:
+            return rebuilt
+        with transaction.atomic():
+            UserStats.objects.filter(
+                user_id__in=[row[0] for row in rows]
+            ).delete()
+            UserStats.objects.bulk_create(
+                UserStats(user_id=row[0], **dict(zip(SOURCES, row[1:])))
+                for row in rows
+            )
+        last_pk = rows[-1][0]
+        rebuilt += len(rows)
+
+
+def get(user):
+    """Статистика пользователя; пропавшая строка пересчитывается."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild(User.objects.filter(pk=user.pk))
+        user.stats = UserStats.objects.get(user=user)
+        return user.stats
@@ -1,59 +1,77 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.db.models import Exists, OuterRef
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.conditional import condition_on_tags
+from . import (
+    cache_tags, counters, exporter, feeds, follow_feed, thumbnails, user_stats
+)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginator import paginate
 
 POSTS_CONST = 10
+COMMENTS_CONST = 20
 
 
+@condition_on_tags(cache_tags.for_index)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POSTS_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = feeds.all_posts()
+    page_obj = paginate(request, posts, POSTS_CONST, scope=counters.ALL)
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
     context = {
         'page_obj': page_obj,
         'title': title,
         'posts': posts,
+        'cache_tags': cache_tags.for_page(page_obj, cache_tags.INDEX),
     }
     return render(request, template, context)
 
 
+@condition_on_tags(cache_tags.for_group)
 def group_posts(request, slug):
     """Страница со списком опубликовавнных постов."""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, POSTS_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = feeds.group_posts(group)
+    page_obj = paginate(
+        request, posts, POSTS_CONST, scope=counters.group_scope(group.pk)
+    )
     template = 'posts/group_list.html'
     title = 'Группы сообщества'
     context = {
         'title': title,
         'group': group,
         'page_obj': page_obj,
+        'cache_tags': cache_tags.for_page(
+            page_obj, cache_tags.group(group.pk)
+        ),
     }
     return render(request, template, context)
 
 
+@condition_on_tags(cache_tags.for_profile)
 def profile(request, username):
     """Здесь код запроса к модели и создание словаря контекста."""
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, POSTS_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    post_count = posts.count()
-    following = request.user.is_authenticated and (
-        Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats').annotate(
+            is_followed=Exists(Follow.objects.filter(
+                user_id=request.user.pk,
+                author=OuterRef('pk')
+            ))
+        ),
+        username=username
+    )
+    stats = user_stats.get(author)
+    posts = feeds.author_posts(author)
+    page_obj = paginate(
+        request, posts, POSTS_CONST,
+        scope=counters.author_scope(author.pk), count=stats.posts_count
     )
+    post_count = stats.posts_count
+    following = author.is_followed
     template = 'posts/profile.html'
     title = f'Профайл пользователя {username}'
     context = {
@@ -62,19 +80,45 @@ def profile(request, username):
         'author': author,
         'posts': posts,
         'post_count': post_count,
+        'stats': stats,
         'following': following,
     }
     return render(request, template, context)
 
 
+@login_required
+def profile_export(request, username):
+    """Выгрузка постов, комментариев и подписок пользователя потоком.
+
+    Скачать её могут сам пользователь и персонал.
+    """
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in exporter.FORMATS:
+        fmt = 'jsonl'
+    response = StreamingHttpResponse(
+        exporter.serialize(exporter.records(author), fmt),
+        content_type=exporter.FORMATS[fmt],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.{fmt}"'
+    )
+    return response
+
+
+@condition_on_tags(cache_tags.for_post_detail)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     author = post.author
     pub_date = post.pub_date
-    post_count = author.posts.all().count()
+    post_count = user_stats.get(author).posts_count
     template = 'posts/post_detail.html'
     form = CommentForm()
-    comments = post.comments.all()
+    comments = _comments_page(request, post)
     context = {
         'post': post,
         'author': author,
@@ -86,6 +130,23 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев фрагментом для подгрузки."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': _comments_page(request, post),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def _comments_page(request, post):
+    return paginate(
+        request, post.comments.select_related('author'), COMMENTS_CONST,
+        ordering=('created', 'id')
+    )
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -94,6 +155,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.enqueue(new_post)
         return redirect('posts:profile', username=request.user.username)
     return render(request, template, {'form': form})
 
@@ -110,7 +172,11 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        # comment_count меняют сигналы комментариев через F(); запись
+        # всех колонок затёрла бы комментарий, добавленный во время правки.
+        form.save(commit=False).save(update_fields=PostForm.Meta.fields)
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post)
         return redirect('posts:post_detail', post.id)
     return render(request, template, {'form': form, 'is_edit': True})
 
@@ -129,10 +195,7 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, POSTS_CONST)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = follow_feed.get_page(request, POSTS_CONST)
     context = {
         'page_obj': page_obj,
     }
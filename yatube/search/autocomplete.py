@@ -0,0 +1,159 @@
+import re
+
+from django.db import transaction
+from django.urls import reverse
+
+from posts.models import Group, User
+from .models import Suggestion, SuggestionPrefix
+
+BATCH_SIZE = 500
+LIMIT = 10
+MAX_PREFIX = SuggestionPrefix._meta.get_field('prefix').max_length
+WORD = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    return text.lower().replace('ё', 'е')
+
+
+def words(text):
+    """Слова подписи и сама подпись целиком, например ``ivan_petrov``."""
+    text = normalize(text)
+    return {text, *WORD.findall(text)} - {''}
+
+
+def prefixes(*texts):
+    """Все префиксы слов длиной до ``MAX_PREFIX`` символов."""
+    result = set()
+    for text in texts:
+        for word in words(text):
+            result.update(
+                word[:length]
+                for length in range(1, min(len(word), MAX_PREFIX) + 1)
+            )
+    return result
+
+
+def user_entry(user):
+    full_name = user.get_full_name()
+    label = f'{user.username} ({full_name})' if full_name else user.username
+    return (
+        Suggestion.USER, user.pk, user.username, label,
+        prefixes(user.username, full_name),
+    )
+
+
+def group_entry(group):
+    return (
+        Suggestion.GROUP, group.pk, group.slug, group.title,
+        prefixes(group.slug, group.title),
+    )
+
+
+@transaction.atomic
+def update(kind, object_id, key, label, entry_prefixes):
+    """Записать подсказку, если её ключ или подпись изменились."""
+    suggestion, created = Suggestion.objects.get_or_create(
+        kind=kind, object_id=object_id,
+        defaults={'key': key, 'label': label},
+    )
+    if not created:
+        if (suggestion.key, suggestion.label) == (key, label):
+            return
+        suggestion.key, suggestion.label = key, label
+        suggestion.save(update_fields=['key', 'label'])
+        suggestion.prefixes.all().delete()
+    SuggestionPrefix.objects.bulk_create(
+        SuggestionPrefix(prefix=prefix, suggestion=suggestion)
+        for prefix in entry_prefixes
+    )
+
+
+@transaction.atomic
+def add_many(entries):
+    """Записать подсказки новых объектов пачкой, например после импорта."""
+    entries = list(entries)
+    Suggestion.objects.bulk_create(
+        (
+            Suggestion(kind=kind, object_id=object_id, key=key, label=label)
+            for kind, object_id, key, label, _ in entries
+        ),
+        ignore_conflicts=True,
+    )
+    ids = {}
+    for kind in {entry[0] for entry in entries}:
+        found = Suggestion.objects.filter(
+            kind=kind,
+            object_id__in=[entry[1] for entry in entries if entry[0] == kind],
+        ).values_list('object_id', 'pk')
+        ids.update(((kind, object_id), pk) for object_id, pk in found)
+    SuggestionPrefix.objects.bulk_create(
+        (
+            SuggestionPrefix(prefix=prefix, suggestion_id=ids[kind, object_id])
+            for kind, object_id, _, _, entry_prefixes in entries
+            for prefix in entry_prefixes
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def remove(kind, object_id):
+    Suggestion.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Заполнить подсказки заново пачками по ``batch_size`` объектов."""
+    SuggestionPrefix.objects.all().delete()
+    Suggestion.objects.all().delete()
+    total = 0
+    for model, entry in ((User, user_entry), (Group, group_entry)):
+        objects = model.objects.order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(objects.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            add_many(entry(obj) for obj in batch)
+            last_pk = batch[-1].pk
+            total += len(batch)
+    return total
+
+
+def suggest(query, limit=LIMIT):
+    """Подсказки, у которых каждое слово запроса начинает какое-то слово.
+
+    Каждое слово запроса добавляет соединение с индексом префиксов,
+    и пересечение считает база. Слова длиннее ``MAX_PREFIX`` индекс
+    знает только по началу, их подсказки дополнительно сверяются
+    с подписью.
+    """
+    query_words = sorted(
+        set(WORD.findall(normalize(query))), key=len, reverse=True
+    )
+    if not query_words:
+        return []
+    suggestions = Suggestion.objects.order_by('pk')
+    for part in query_words:
+        suggestions = suggestions.filter(prefixes__prefix=part[:MAX_PREFIX])
+    long_words = [part for part in query_words if len(part) > MAX_PREFIX]
+    if not long_words:
+        return list(suggestions[:limit])
+    results = []
+    for suggestion in suggestions.iterator():
+        label_words = words(f'{suggestion.key} {suggestion.label}')
+        if all(
+            any(word.startswith(part) for word in label_words)
+            for part in long_words
+        ):
+            results.append(suggestion)
+            if len(results) == limit:
+                break
+    return results
+
+
+def as_json(suggestion):
+    if suggestion.kind == Suggestion.USER:
+        url = reverse('posts:profile', args=[suggestion.key])
+    else:
+        url = reverse('posts:group_list', args=[suggestion.key])
+    return {'type': suggestion.kind, 'label': suggestion.label, 'url': url}
@@ -0,0 +1,179 @@
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Coalesce
+
+from posts import counters
+from posts.models import Post
+from .models import Posting, Term
+from .stemmer import stem
+
+BATCH_SIZE = 500
+MAX_STEM_LENGTH = 64
+WORD = re.compile(r'[0-9a-zа-яё]+')
+CYRILLIC = re.compile(r'[а-яё]')
+STOP_WORDS = frozenset(
+    'а без более бы был была были было быть в вам вас весь во вот все '
+    'всего всех вы где да даже для до его ее ей ему если есть еще же за '
+    'и из или им их к как какой когда кто ли лишь мне меня мы на над не '
+    'него нее нет ни них но ну о об однако он она они оно от по под при '
+    'про с со так также такой там те тем то того тоже только том ты у '
+    'уже хотя чего чей чем что чтобы эта эти это этого этой этом этот я'
+    .split()
+)
+
+
+def terms(text):
+    """Основы слов текста без стоп-слов, с повторами."""
+    result = []
+    for word in WORD.findall(text.lower().replace('ё', 'е')):
+        if word in STOP_WORDS:
+            continue
+        if CYRILLIC.search(word):
+            word = stem(word)
+        if word:
+            result.append(word[:MAX_STEM_LENGTH])
+    return result
+
+
+def _term_ids(stems):
+    """Идентификаторы основ; недостающие основы создаются."""
+    stems = set(stems)
+    ids = dict(Term.objects.filter(stem__in=stems).values_list('stem', 'pk'))
+    missing = stems.difference(ids)
+    if missing:
+        Term.objects.bulk_create(
+            (Term(stem=value) for value in missing), ignore_conflicts=True
+        )
+        ids.update(
+            Term.objects.filter(stem__in=missing).values_list('stem', 'pk')
+        )
+    return ids
+
+
+@transaction.atomic
+def index_post(post):
+    """Обновить вхождения поста; счётчики основ сдвигаются на разницу."""
+    frequencies = Counter(terms(post.text))
+    previous = dict(
+        Posting.objects.filter(post=post).values_list(
+            'term__stem', 'frequency'
+        )
+    )
+    if previous == frequencies:
+        return
+    ids = _term_ids(frequencies)
+    Posting.objects.filter(post=post).delete()
+    Posting.objects.bulk_create(
+        Posting(term_id=ids[value], post=post, frequency=frequency)
+        for value, frequency in frequencies.items()
+    )
+    added = frequencies.keys() - previous.keys()
+    removed = previous.keys() - frequencies.keys()
+    Term.objects.filter(stem__in=added).update(
+        document_count=F('document_count') + 1
+    )
+    Term.objects.filter(stem__in=removed).update(
+        document_count=F('document_count') - 1
+    )
+
+
+def unindex_post(post):
+    """Уменьшить счётчики основ поста; вхождения удалит каскад."""
+    Term.objects.filter(postings__post=post).update(
+        document_count=F('document_count') - 1
+    )
+
+
+def _index_rows(rows):
+    """Записать вхождения постов ``(pk, текст)``, у которых их ещё нет.
+
+    Возвращает идентификаторы затронутых основ.
+    """
+    batch = [(pk, Counter(terms(text))) for pk, text in rows]
+    ids = _term_ids(
+        value for _, frequencies in batch for value in frequencies
+    )
+    Posting.objects.bulk_create(
+        Posting(term_id=ids[value], post_id=pk, frequency=frequency)
+        for pk, frequencies in batch
+        for value, frequency in frequencies.items()
+    )
+    return set(ids.values())
+
+
+def _recount(terms):
+    document_count = Posting.objects.filter(
+        term=OuterRef('pk')
+    ).order_by().values('term').annotate(total=Count('pk')).values('total')
+    terms.update(document_count=Coalesce(
+        Subquery(document_count, output_field=IntegerField()), 0
+    ))
+
+
+@transaction.atomic
+def index_posts(pks, batch_size=BATCH_SIZE):
+    """Проиндексировать новые посты пачками, например после импорта."""
+    pks, term_ids = sorted(pks), set()
+    for start in range(0, len(pks), batch_size):
+        term_ids |= _index_rows(Post.objects.filter(
+            pk__in=pks[start:start + batch_size]
+        ).values_list('pk', 'text'))
+    _recount(Term.objects.filter(pk__in=term_ids))
+
+
+@transaction.atomic
+def rebuild(batch_size=BATCH_SIZE):
+    """Построить индекс заново пачками по ``batch_size`` постов."""
+    Posting.objects.all().delete()
+    Term.objects.all().delete()
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last_pk, indexed = 0, 0
+    while True:
+        rows = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not rows:
+            break
+        _index_rows(rows)
+        last_pk = rows[-1][0]
+        indexed += len(rows)
+    _recount(Term.objects.all())
+    return indexed
+
+
+def _weight(document_count, total):
+    """Вес основы: редкие слова важнее частых (IDF в тысячных)."""
+    return 1 + round(
+        1000 * math.log((total + 1) / (max(document_count, 0) + 1))
+    )
+
+
+def search_posts(query):
+    """Посты со всеми словами запроса, с релевантностью ``rank``."""
+    stems = set(terms(query))
+    found = Term.objects.filter(stem__in=stems).values_list(
+        'pk', 'document_count'
+    )
+    found = dict(found) if stems else {}
+    if not found or len(found) < len(stems):
+        return Post.objects.none().annotate(rank=Value(0, IntegerField()))
+    total = counters.get(counters.ALL, Post.objects.all())
+    rank = Sum(Case(
+        *(
+            When(
+                postings__term_id=term_id,
+                then=F('postings__frequency') * _weight(count, total),
+            )
+            for term_id, count in found.items()
+        ),
+        output_field=IntegerField(),
+    ))
+    return Post.objects.filter(
+        postings__term_id__in=found
+    ).annotate(
+        rank=rank, matched=Count('postings')
+    ).filter(matched=len(found))
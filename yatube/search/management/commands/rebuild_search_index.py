@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from search import autocomplete, index
+
+
+class Command(BaseCommand):
+    help = 'Строит заново поисковый индекс постов и подсказки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=index.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        indexed = index.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
+        suggestions = autocomplete.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(f'Подсказок: {suggestions}')
@@ -0,0 +1,86 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:26
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def fill_index(apps, schema_editor):
+    from search.index import terms
+
+    Post = apps.get_model('posts', 'Post')
+    Term = apps.get_model('search', 'Term')
+    Posting = apps.get_model('search', 'Posting')
+    # Посты читаются пачками по ключу; размер вставок bulk_create без
+    # явного batch_size Django подбирает под предел базы.
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last_pk = 0
+    while True:
+        rows = list(posts.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not rows:
+            break
+        batch = [(pk, Counter(terms(text))) for pk, text in rows]
+        stems = {value for _, frequencies in batch for value in frequencies}
+        ids = dict(
+            Term.objects.filter(stem__in=stems).values_list('stem', 'pk')
+        )
+        missing = stems.difference(ids)
+        Term.objects.bulk_create(Term(stem=value) for value in missing)
+        ids.update(
+            Term.objects.filter(stem__in=missing).values_list('stem', 'pk')
+        )
+        Posting.objects.bulk_create(
+            Posting(term_id=ids[value], post_id=pk, frequency=frequency)
+            for pk, frequencies in batch
+            for value, frequency in frequencies.items()
+        )
+        last_pk = rows[-1][0]
+    document_count = Posting.objects.filter(
+        term=OuterRef('pk')
+    ).order_by().values('term').annotate(total=Count('pk')).values('total')
+    Term.objects.update(document_count=Coalesce(
+        Subquery(document_count, output_field=models.IntegerField()), 0
+    ))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0010_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stem', models.CharField(max_length=64, unique=True)),
+                ('document_count', models.IntegerField(default=0, verbose_name='Постов со словом')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.IntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='posts.Post')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='search.Term')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='posting',
+            index=models.Index(fields=['post'], name='posting_post_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posting',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_posting'),
+        ),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_suggestions(apps, schema_editor):
+    from search.autocomplete import prefixes
+
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Suggestion = apps.get_model('search', 'Suggestion')
+    SuggestionPrefix = apps.get_model('search', 'SuggestionPrefix')
+    entries = []
+    for user in User.objects.iterator():
+        full_name = f'{user.first_name} {user.last_name}'.strip()
+        label = f'{user.username} ({full_name})' if full_name else user.username
+        entries.append(
+            ('user', user.pk, user.username, label,
+             prefixes(user.username, full_name))
+        )
+    for group in Group.objects.iterator():
+        entries.append(
+            ('group', group.pk, group.slug, group.title,
+             prefixes(group.slug, group.title))
+        )
+    for kind, object_id, key, label, entry_prefixes in entries:
+        suggestion = Suggestion.objects.create(
+            kind=kind, object_id=object_id, key=key, label=label
+        )
+        SuggestionPrefix.objects.bulk_create(
+            SuggestionPrefix(prefix=prefix, suggestion=suggestion)
+            for prefix in entry_prefixes
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа')], max_length=8)),
+                ('object_id', models.IntegerField()),
+                ('key', models.CharField(max_length=150, verbose_name='Имя пользователя или slug')),
+                ('label', models.CharField(max_length=400)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SuggestionPrefix',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=16)),
+                ('suggestion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prefixes', to='search.Suggestion')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='suggestion',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_suggestion'),
+        ),
+        migrations.AddConstraint(
+            model_name='suggestionprefix',
+            constraint=models.UniqueConstraint(fields=('prefix', 'suggestion'), name='unique_suggestion_prefix'),
+        ),
+        migrations.RunPython(fill_suggestions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from django.db import models
+
+from posts.models import Post
+
+
+class Term(models.Model):
+    """Основа слова в поисковом индексе."""
+    stem = models.CharField(max_length=64, unique=True)
+    document_count = models.IntegerField('Постов со словом', default=0)
+
+    def __str__(self):
+        return self.stem
+
+
+class Posting(models.Model):
+    """Вхождение основы в текст поста."""
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='postings',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='postings',
+    )
+    frequency = models.IntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'], name='unique_posting'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['post'], name='posting_post_idx'),
+        ]
+
+
+class Suggestion(models.Model):
+    """Пользователь или группа, которых предлагает автодополнение."""
+    USER = 'user'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+    kind = models.CharField(max_length=8, choices=KINDS)
+    object_id = models.IntegerField()
+    key = models.CharField('Имя пользователя или slug', max_length=150)
+    label = models.CharField(max_length=400)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'], name='unique_suggestion'
+            )
+        ]
+
+    def __str__(self):
+        return self.label
+
+
+class SuggestionPrefix(models.Model):
+    """Префикс слова подсказки; поиск — точное совпадение по индексу."""
+    prefix = models.CharField(max_length=16)
+    suggestion = models.ForeignKey(
+        Suggestion,
+        on_delete=models.CASCADE,
+        related_name='prefixes',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['prefix', 'suggestion'],
+                name='unique_suggestion_prefix'
+            )
+        ]
@@ -0,0 +1,18 @@
+from django.db import models
+
+from posts.paginator import CursorPaginator
+
+RANK = models.IntegerField()
+RANK.set_attributes_from_name('rank')
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный paginator по релевантности и id."""
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page, ('-rank', '-id'), **kwargs)
+
+    def _field(self, name):
+        if name == 'rank':
+            return RANK
+        return super()._field(name)
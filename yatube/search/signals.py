@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from posts.models import Group, Post, User
+from posts.signals import bulk_imported
+from . import autocomplete, index
+from .models import Suggestion
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index.index_post(instance)
+
+
+@receiver(bulk_imported, sender=Post)
+def posts_imported(sender, pks, **kwargs):
+    index.index_posts(pks)
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    index.unindex_post(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and update_fields != frozenset({'last_login'}):
+        autocomplete.update(*autocomplete.user_entry(instance))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.remove(Suggestion.USER, instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.update(*autocomplete.group_entry(instance))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    autocomplete.remove(Suggestion.GROUP, instance.pk)
+
+
+@receiver(bulk_imported, sender=Group)
+def groups_imported(sender, pks, **kwargs):
+    autocomplete.add_many(
+        autocomplete.group_entry(group)
+        for group in Group.objects.filter(pk__in=pks)
+    )
+
+
+@receiver(bulk_imported, sender=User)
+def users_imported(sender, pks, **kwargs):
+    autocomplete.add_many(
+        autocomplete.user_entry(user)
+        for user in User.objects.filter(pk__in=pks)
+    )
@@ -0,0 +1,89 @@
+VOWELS = 'аеиоуыэюя'
+
+
+def _endings(guarded='', plain=''):
+    """Окончания от длинных к коротким; guarded — только после а или я."""
+    endings = [(ending, True) for ending in guarded.split()]
+    endings += [(ending, False) for ending in plain.split()]
+    return sorted(endings, key=lambda item: -len(item[0]))
+
+
+PERFECTIVE_GERUND = _endings(
+    'в вши вшись', 'ив ивши ившись ыв ывши ывшись'
+)
+ADJECTIVE = _endings(
+    plain='ее ие ые ое ими ыми ей ий ый ой ем им ым ом его ого ему ому '
+          'их ых ую юю ая яя ою ею'
+)
+PARTICIPLE = _endings('ем нн вш ющ щ', 'ивш ывш ующ')
+REFLEXIVE = _endings(plain='ся сь')
+VERB = _endings(
+    'ла на ете йте ли й л ем н ло но ет ют ны ть ешь нно',
+    'ила ыла ена ейте уйте ите или ыли ей уй ил ыл им ым ен ило ыло ено '
+    'ят ует уют ит ыт ены ить ыть ишь ую ю'
+)
+NOUN = _endings(
+    plain='а ев ов ие ье е иями ями ами еи ии и ией ей ой ий й иям ям ием '
+          'ем ам ом о у ах иях ях ы ь ию ью ю ия ья я'
+)
+DERIVATIONAL = _endings(plain='ост ость')
+SUPERLATIVE = _endings(plain='ейш ейше')
+
+
+def _regions(word):
+    """Начала областей RV и R2 алгоритма Snowball."""
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def _strip(word, start, endings):
+    """Снять самое длинное окончание, целиком лежащее в word[start:].
+
+    Возвращает новое слово и снятое окончание; если окончание не
+    подошло, слово не меняется, а окончание равно None.
+    """
+    for ending, guarded in endings:
+        stem = word[:-len(ending)]
+        if not word.endswith(ending) or len(stem) < start:
+            continue
+        if guarded and (len(stem) <= start or stem[-1] not in 'ая'):
+            return word, None
+        return stem, ending
+    return word, None
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Snowball (Портера)."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+    word, ending = _strip(word, rv, PERFECTIVE_GERUND)
+    if ending is None:
+        word, _ = _strip(word, rv, REFLEXIVE)
+        word, ending = _strip(word, rv, ADJECTIVE)
+        if ending is not None:
+            word, _ = _strip(word, rv, PARTICIPLE)
+        else:
+            word, ending = _strip(word, rv, VERB)
+            if ending is None:
+                word, _ = _strip(word, rv, NOUN)
+    if word.endswith('и') and len(word) > rv:
+        word = word[:-1]
+    word, _ = _strip(word, r2, DERIVATIONAL)
+    word, ending = _strip(word, rv, SUPERLATIVE)
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif ending is None and word.endswith('ь') and len(word) > rv:
+        word = word[:-1]
+    return word
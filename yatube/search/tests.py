@@ -0,0 +1,192 @@
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+from .autocomplete import rebuild, suggest
+from .index import search_posts, terms
+from .models import Posting, Suggestion, Term
+from .stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к одной основе."""
+        cases = {
+            'книга': 'книг',
+            'книги': 'книг',
+            'красивейшая': 'красив',
+            'бегущий': 'бегущ',
+            'читающимися': 'чита',
+            'ёлками': 'елк',
+        }
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_stop_words_are_skipped(self):
+        """Служебные слова не попадают в индекс."""
+        self.assertEqual(
+            terms('Кот и пёс, и Python 3'), ['кот', 'пес', 'python', '3']
+        )
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Кошки любят рыбу, кошка спит'
+        )
+        cls.fish = Post.objects.create(
+            author=cls.user, text='Рыбы плавают, рыба молчит'
+        )
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при сохранении и удалении поста."""
+        self.assertEqual(list(search_posts('кошкам')), [self.cats])
+        cats = Post.objects.get(pk=self.cats.pk)
+        cats.text = 'Собаки'
+        cats.save()
+        self.assertFalse(search_posts('кошка').exists())
+        self.assertEqual(Term.objects.get(stem='кошк').document_count, 0)
+        Post.objects.get(pk=self.fish.pk).delete()
+        self.assertEqual(Term.objects.get(stem='рыб').document_count, 0)
+        self.assertFalse(search_posts('рыба').exists())
+
+    def test_results_are_ranked(self):
+        """Все слова запроса обязательны, частые вхождения выше."""
+        self.assertEqual(
+            list(search_posts('рыба').order_by('-rank')),
+            [self.fish, self.cats]
+        )
+        self.assertEqual(list(search_posts('рыба кошка')), [self.cats])
+        self.assertFalse(search_posts('рыба собака').exists())
+
+    def test_rebuild_restores_index(self):
+        """Команда перестраивает индекс с нуля."""
+        Posting.objects.all().delete()
+        Term.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(search_posts('кошки')), [self.cats])
+        self.assertEqual(Term.objects.get(stem='рыб').document_count, 2)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='An')
+        for number in range(12):
+            Post.objects.create(
+                author=cls.user, text='слово ' * (number + 1) + str(number)
+            )
+
+    def test_search_pages(self):
+        """Поиск отдаёт страницы по релевантности и держит запрос."""
+        url = reverse('search:search')
+        response = self.client.get(url, {'q': 'слова'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertEqual(page_obj[0].text.count('слово'), 12)
+        self.assertContains(response, '?q=%D1%81%D0%BB%D0%BE%D0%B2%D0%B0&amp;')
+        rest = self.client.get(
+            url, {'q': 'слова', 'cursor': page_obj.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.text.count('слово') for post in rest], [2, 1]
+        )
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через индекс."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': '11'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='ivan_petrov', first_name='Иван', last_name='Петров'
+        )
+        cls.other = User.objects.create_user(username='ivy')
+        cls.group = Group.objects.create(
+            title='Ёжики в тумане', slug='hedgehogs', description='Описание'
+        )
+
+    def test_prefixes_of_any_word_match(self):
+        """Подсказка находится по началу любого слова имени или группы."""
+        cases = {
+            'iv': ['ivan_petrov', 'ivy'],
+            'ivan_p': ['ivan_petrov'],
+            'петр': ['ivan_petrov'],
+            'иван пет': ['ivan_petrov'],
+            'ежик': ['hedgehogs'],
+            'hedge': ['hedgehogs'],
+            'петр сидор': [],
+        }
+        for query, keys in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(
+                    [item.key for item in suggest(query)], keys
+                )
+
+    def test_all_words_are_matched_in_database(self):
+        """Совпадение по всем словам не теряется среди частых имён."""
+        for index in range(60):
+            User.objects.create_user(
+                username=f'user{index}', first_name='Иван',
+                last_name=f'Кузнецов{index}'
+            )
+        User.objects.create_user(
+            username='sidorov', first_name='Иван', last_name='Сидоров'
+        )
+        self.assertEqual(
+            [item.key for item in suggest('иван сид')], ['sidorov']
+        )
+        self.assertEqual(len(suggest('иван')), 10)
+
+    def test_rebuild_restores_suggestions(self):
+        """Подсказки строятся заново пачками."""
+        Suggestion.objects.all().delete()
+        self.assertEqual(rebuild(batch_size=1), 3)
+        self.assertEqual(
+            [item.key for item in suggest('iv')], ['ivan_petrov', 'ivy']
+        )
+        self.assertEqual(
+            [item.key for item in suggest('ежики в тумане')], ['hedgehogs']
+        )
+
+    def test_suggestions_follow_changes(self):
+        """Переименование и удаление сразу видны в подсказках."""
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Совы'
+        group.save()
+        self.assertEqual(suggest('ежик'), [])
+        self.assertEqual([item.label for item in suggest('сов')], ['Совы'])
+        group.delete()
+        self.assertEqual(suggest('сов'), [])
+        self.assertFalse(
+            Suggestion.objects.filter(kind=Suggestion.GROUP).exists()
+        )
+
+    def test_endpoint_returns_urls(self):
+        """Эндпоинт отдаёт подписи и адреса страниц."""
+        response = self.client.get(
+            reverse('search:autocomplete'), {'q': 'Иван'}
+        )
+        self.assertEqual(response.json(), {'results': [{
+            'type': 'user',
+            'label': 'ivan_petrov (Иван Петров)',
+            'url': reverse('posts:profile', args=['ivan_petrov']),
+        }]})
@@ -0,0 +1,33 @@
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.utils.http import urlencode
+
+from posts import feeds
+from posts.views import POSTS_CONST
+from . import autocomplete
+from .index import search_posts
+from .paginator import SearchPaginator
+
+
+def search(request):
+    """Посты по словам запроса, самые релевантные первыми."""
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(feeds.project(search_posts(query)),
+                                POSTS_CONST)
+    page_obj = paginator.get_cursor_page(request.GET.get('cursor'))
+    context = {
+        'title': 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'search/results.html', context)
+
+
+def suggest(request):
+    """Подсказки пользователей и групп по началу слов, в JSON."""
+    suggestions = autocomplete.suggest(request.GET.get('q', ''))
+    return JsonResponse(
+        {'results': [autocomplete.as_json(item) for item in suggestions]},
+        json_dumps_params={'ensure_ascii': False},
+    )
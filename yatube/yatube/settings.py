@@ -19,6 +19,8 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -30,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -111,11 +114,51 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загружаемые картинки: больше POST_IMAGE_MAX_PIXELS отклоняются
+# до декодирования, а оригинал хранится не больше POST_IMAGE_MAX_SIDE
+# по большей стороне.
+POST_IMAGE_MAX_PIXELS = 50_000_000
+POST_IMAGE_MAX_SIDE = 2560
 
+# Процессы, которые строят миниатюры после сохранения поста;
+# при 0 миниатюры строятся сразу, в том же процессе.
+THUMBNAIL_WORKERS = 2
+
+# Отдача MEDIA_URL: 'python' — через wsgi.file_wrapper сервера
+# (gunicorn и uWSGI отдают файл os.sendfile), 'x-sendfile' — Apache
+# или lighttpd, 'x-accel-redirect' — nginx через internal location
+# MEDIA_ACCEL_REDIRECT_URL с alias на MEDIA_ROOT.
+MEDIA_SENDFILE = 'python'
+MEDIA_ACCEL_REDIRECT_URL = '/protected-media/'
+
+
+# Версии тегов и фрагменты живут TIMEOUT секунд. LocMemCache у каждого
+# процесса свой, и cache.bump() в одном воркере не виден другим: таймаут
+# ограничивает, сколько они отдают устаревшие фрагменты. С общим кэшем
+# (memcached, Redis) его можно поднять.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 20,
     }
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Движок ленты подписок: 'join', 'timeline' или 'merge'. Таблица лент
+# TimelineEntry ведётся только при 'timeline'; после переключения на него
+# ленты строит заново команда rebuild_timelines, а при переключении на
+# другой движок она же очищает таблицу.
+FOLLOW_FEED_ENGINE = 'timeline'
+FOLLOW_FEED_RECENT_POSTS = 200
+FOLLOW_FEED_CACHED_PAGES = 3
+
+# Поиск N+1 запросов; бюджеты задаются по имени view, например
+# {'posts:index': 5}, а RAISE роняет тесты при их превышении.
+QUERY_INSPECTOR = {
+    'ENABLED': DEBUG,
+    'REPEAT_THRESHOLD': 3,
+    'BUDGET': None,
+    'BUDGETS': {},
+    'RAISE': False,
+}